@@ -0,0 +1,21 @@
+import asyncio
+import time
+from greenletio import async_, GreenletPool
+
+CALLS = 500000
+
+
+@async_(pool=GreenletPool())
+def fn(arg):
+    return arg
+
+
+async def main():
+    now = time.perf_counter()
+    for i in range(CALLS):
+        await fn(i)
+    elapsed = time.perf_counter() - now
+    print('%d' % (CALLS / elapsed))
+
+
+asyncio.run(main())
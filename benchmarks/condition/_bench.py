@@ -0,0 +1,49 @@
+import sys
+import threading
+import time
+
+WAITERS = int(sys.argv[1]) if len(sys.argv) > 1 else 1000
+ROUNDS = 10
+
+
+def consumer(lock, not_empty, empty, items):
+    for i in range(ROUNDS):
+        with lock:
+            while not items:
+                not_empty.wait()
+            items.pop()
+            if not items:
+                empty.notify()
+
+
+def producer(lock, not_empty, empty, items):
+    for i in range(ROUNDS):
+        with lock:
+            while items:
+                empty.wait()
+            items.extend(range(WAITERS))
+            not_empty.notify_all()
+
+
+def run():
+    lock = threading.RLock()
+    not_empty = threading.Condition(lock)
+    empty = threading.Condition(lock)
+    items = []
+    args = (lock, not_empty, empty, items)
+    threads = [threading.Thread(target=consumer, args=args)
+               for i in range(WAITERS)]
+    threads.append(threading.Thread(target=producer, args=args))
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+
+
+def main():
+    now = time.perf_counter()
+    run()
+    print('%f' % (time.perf_counter() - now))
+
+
+main()
@@ -0,0 +1,32 @@
+bar() {
+    i=$1
+    count=$2
+    printf "\r["
+    if [[ "$i" > "0" ]]; then
+        printf "%0.s#" $(seq 1 $i)
+    fi
+    if [[ "$i" < "$count" ]]; then
+        printf "%0.s " $(seq 1 $((count-i)))
+    fi
+    printf "]"
+}
+
+run() {
+    count=$(($(ls [a-z]*.py | wc -l) * 2))
+    i=0
+    bar $i $count 1>&2
+    for waiters in 1000 10000; do
+        for script in [a-z]*.py; do
+            t=$(python $script $waiters)
+            printf "${t}_${waiters}_$script\n"
+            i=$((i+1))
+            bar $i $count 1>&2
+        done
+    done
+    printf "\n" 1>&2
+}
+
+R=$(run)
+for line in $R; do
+    echo $line
+done | sort
@@ -0,0 +1,20 @@
+import asyncio
+import time
+
+CONTEXT_SWITCHES = 1000000
+
+
+async def run():
+    counter = 0
+    while counter <= CONTEXT_SWITCHES:
+        await asyncio.sleep(0)
+        counter += 1
+
+
+async def main():
+    now = time.perf_counter()
+    await run()
+    print('%f' % (time.perf_counter() - now))
+
+
+asyncio.run(main())
@@ -0,0 +1,23 @@
+import asyncio
+import time
+from greenletio import async_
+from greenletio.green.time import sleep
+
+CONTEXT_SWITCHES = 1000000
+
+
+@async_
+def run():
+    counter = 0
+    while counter <= CONTEXT_SWITCHES:
+        sleep(0)
+        counter += 1
+
+
+async def main():
+    now = time.perf_counter()
+    await run()
+    print('%f' % (time.perf_counter() - now))
+
+
+asyncio.run(main())
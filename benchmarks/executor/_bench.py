@@ -0,0 +1,36 @@
+import concurrent.futures
+import sys
+import time
+
+TASKS = 100000
+WORKERS = 100
+DELAY = 0 if 'overhead' in sys.argv else 0.001
+
+
+def task(i):
+    # a short I/O operation, or no operation at all to measure the overhead
+    # of the executor
+    if DELAY:
+        time.sleep(DELAY)
+    return i
+
+
+def run(executor_class):
+    with executor_class(max_workers=WORKERS) as executor:
+        for result in executor.map(task, range(TASKS)):
+            pass
+
+
+def main():
+    if 'greenletio' in sys.argv:
+        from greenletio import async_, GreenletExecutor
+        import asyncio
+        now = time.perf_counter()
+        asyncio.run(async_(run)(GreenletExecutor))
+    else:
+        now = time.perf_counter()
+        run(concurrent.futures.ThreadPoolExecutor)
+    print('%f' % (time.perf_counter() - now))
+
+
+main()
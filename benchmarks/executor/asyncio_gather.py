@@ -0,0 +1,25 @@
+import asyncio
+import time
+
+TASKS = 100000
+WORKERS = 100
+
+
+async def task(i, sem):
+    async with sem:
+        await asyncio.sleep(0.001)
+        return i
+
+
+async def run():
+    sem = asyncio.Semaphore(WORKERS)
+    await asyncio.gather(*[task(i, sem) for i in range(TASKS)])
+
+
+def main():
+    now = time.perf_counter()
+    asyncio.run(run())
+    print('%f' % (time.perf_counter() - now))
+
+
+main()
@@ -0,0 +1,36 @@
+import threading
+import time
+
+THREADS = 10
+ACCESSES = 1000000
+SWITCH_EVERY = 1000
+
+local = threading.local()
+
+
+def worker():
+    local.value = 0
+    for i in range(ACCESSES // THREADS // SWITCH_EVERY):
+        for j in range(SWITCH_EVERY):
+            # one read and one write of a thread-local attribute
+            local.value += 1
+        # let the other threads run
+        time.sleep(0)
+    assert local.value == ACCESSES // THREADS
+
+
+def run():
+    threads = [threading.Thread(target=worker) for i in range(THREADS)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+
+
+def main():
+    now = time.perf_counter()
+    run()
+    print('%f' % (time.perf_counter() - now))
+
+
+main()
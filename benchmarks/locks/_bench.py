@@ -0,0 +1,38 @@
+import threading
+import time
+
+ACQUIRES = 1000000
+THREADS = 10
+
+
+def uncontended():
+    lock = threading.Lock()
+    for i in range(ACQUIRES):
+        with lock:
+            pass
+
+
+def contended(lock):
+    for i in range(ACQUIRES // THREADS // 10):
+        with lock:
+            time.sleep(0)
+
+
+def run():
+    uncontended()
+    lock = threading.Lock()
+    threads = [threading.Thread(target=contended, args=(lock,))
+               for i in range(THREADS)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+
+
+def main():
+    now = time.perf_counter()
+    run()
+    print('%f' % (time.perf_counter() - now))
+
+
+main()
@@ -0,0 +1,3 @@
+from greenletio import patch_blocking
+with patch_blocking():
+    import _bench  # noqa: F401
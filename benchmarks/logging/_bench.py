@@ -0,0 +1,53 @@
+import asyncio
+import logging
+import sys
+import time
+import tracemalloc
+
+CALLS = 100000
+
+
+class FormatHandler(logging.Handler):
+    # format the records, but do not store them anywhere
+    def emit(self, record):
+        self.format(record)
+
+
+handler = FormatHandler()
+handler.setFormatter(logging.Formatter('%(threadName)s %(message)s'))
+logging.getLogger().addHandler(handler)
+logging.getLogger().setLevel(logging.INFO)
+
+
+def log(i):
+    logging.info('message %d', i)
+
+
+async def run_async():
+    from greenletio import async_
+    for i in range(CALLS):
+        # each call runs in a new greenlet
+        await async_(log)(i)
+
+
+def run():
+    if 'greenletio' in sys.argv:
+        asyncio.run(run_async())
+    else:
+        for i in range(CALLS):
+            log(i)
+
+
+def main():
+    if 'memory' in sys.argv:
+        # report the memory that is still allocated after the calls
+        tracemalloc.start()
+        run()
+        print('%d KB' % (tracemalloc.get_traced_memory()[0] // 1024))
+    else:
+        now = time.perf_counter()
+        run()
+        print('%f' % (time.perf_counter() - now))
+
+
+main()
@@ -0,0 +1,10 @@
+import sys
+from greenletio import patch_blocking
+
+sys.argv.append('greenletio')
+# the logging package is imported by asyncio before patching, so it is
+# removed to get a copy that uses the green threading module, as in an
+# application that imports it patched
+del sys.modules['logging']
+with patch_blocking():
+    import _bench  # noqa: F401
@@ -0,0 +1,38 @@
+import queue
+import threading
+import time
+
+ITEMS = 100000
+PAIRS = 10
+
+
+def producer(q):
+    for i in range(ITEMS // PAIRS):
+        q.put(i)
+    q.put(None)
+
+
+def consumer(q):
+    while q.get() is not None:
+        pass
+
+
+def run():
+    threads = []
+    for i in range(PAIRS):
+        q = queue.Queue(maxsize=100)
+        threads.append(threading.Thread(target=producer, args=(q,)))
+        threads.append(threading.Thread(target=consumer, args=(q,)))
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+
+
+def main():
+    now = time.perf_counter()
+    run()
+    print('%f' % (time.perf_counter() - now))
+
+
+main()
@@ -0,0 +1,34 @@
+import asyncio
+import time
+
+ITEMS = 100000
+PAIRS = 10
+
+
+async def producer(q):
+    for i in range(ITEMS // PAIRS):
+        await q.put(i)
+    await q.put(None)
+
+
+async def consumer(q):
+    while (await q.get()) is not None:
+        pass
+
+
+async def run():
+    tasks = []
+    for i in range(PAIRS):
+        q = asyncio.Queue(maxsize=100)
+        tasks.append(producer(q))
+        tasks.append(consumer(q))
+    await asyncio.gather(*tasks)
+
+
+def main():
+    now = time.perf_counter()
+    asyncio.run(run())
+    print('%f' % (time.perf_counter() - now))
+
+
+main()
@@ -0,0 +1,33 @@
+import selectors
+import socket
+import sys
+import time
+
+FDS = int(sys.argv[1]) if len(sys.argv) > 1 else 100
+ITERATIONS = 1000
+
+
+def run():
+    sel = selectors.SelectSelector()
+    pairs = [socket.socketpair() for i in range(FDS // 2)]
+    for a, b in pairs:
+        sel.register(a, selectors.EVENT_READ)
+        sel.register(b, selectors.EVENT_READ)
+    writer, reader = pairs[0]
+    for i in range(ITERATIONS):
+        writer.send(b'x')
+        for key, events in sel.select():
+            key.fileobj.recv(1)
+    sel.close()
+    for a, b in pairs:
+        a.close()
+        b.close()
+
+
+def main():
+    now = time.perf_counter()
+    run()
+    print('%f' % (time.perf_counter() - now))
+
+
+main()
@@ -0,0 +1,46 @@
+import socket
+import sys
+import threading
+import time
+
+TOTAL = 100 * 1024 * 1024
+BUFFER_SIZE = 64 * 1024
+HEADER = b'x' * 200
+
+
+def receiver(sock):
+    buf = bytearray(BUFFER_SIZE)
+    received = 0
+    while received < TOTAL:
+        received += sock.recv_into(buf)
+    sock.close()
+
+
+def sender(sock, vectored):
+    if vectored:
+        # each message is a small header followed by a large body, sent
+        # without concatenating them
+        body = b'x' * (BUFFER_SIZE - len(HEADER))
+        for i in range(TOTAL // BUFFER_SIZE):
+            sock.sendall_vectored([HEADER, body])
+    else:
+        sock.sendall(b'x' * TOTAL)
+    sock.close()
+
+
+def main(vectored=False):
+    a, b = socket.socketpair()
+    # small kernel buffers force many partial writes on the sender side
+    a.setsockopt(socket.SOL_SOCKET, socket.SO_SNDBUF, BUFFER_SIZE)
+    b.setsockopt(socket.SOL_SOCKET, socket.SO_RCVBUF, BUFFER_SIZE)
+    t1 = threading.Thread(target=receiver, args=(b,))
+    t2 = threading.Thread(target=sender, args=(a, vectored))
+    t1.start()
+    t2.start()
+    t1.join()
+    t2.join()
+
+
+now = time.perf_counter()
+main(vectored='vectored' in sys.argv)
+print('%f' % (time.perf_counter() - now))
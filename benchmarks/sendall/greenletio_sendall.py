@@ -0,0 +1,4 @@
+from greenletio import patch_blocking
+
+with patch_blocking():
+    import _bench  # noqa: F401
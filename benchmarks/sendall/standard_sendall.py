@@ -0,0 +1 @@
+import _bench  # noqa: F401
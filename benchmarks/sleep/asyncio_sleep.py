@@ -0,0 +1,20 @@
+import asyncio
+import random
+import time
+
+GREENLETS = 100000
+SLEEPS = 5
+
+
+async def sleeper():
+    for i in range(SLEEPS):
+        await asyncio.sleep(random.randint(1, 50) / 1000)
+
+
+async def main():
+    now = time.perf_counter()
+    await asyncio.gather(*[sleeper() for i in range(GREENLETS)])
+    print('%f' % (time.perf_counter() - now))
+
+
+asyncio.run(main())
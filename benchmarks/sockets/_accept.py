@@ -0,0 +1,60 @@
+"""Measure the rate at which a green server accepts connections.
+
+Bursts of connections are opened against the server, and then they are
+accepted either one at a time with ``accept()``, or in batches with
+``accept_many()``:
+
+    python _accept.py
+    python _accept.py many
+"""
+import sys
+import time
+from greenletio import patch_blocking
+
+with patch_blocking():
+    import socket
+    import threading
+
+BURSTS = 10
+BURST_SIZE = 1000
+
+
+def accept_burst(server_sock, many):
+    accepted = []
+    while len(accepted) < BURST_SIZE:
+        if many:
+            accepted += server_sock.accept_many()
+        else:
+            accepted.append(server_sock.accept())
+    return accepted
+
+
+def main(many):
+    elapsed = 0
+    server_sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+    server_sock.bind(('127.0.0.1', 0))
+    server_sock.listen(BURST_SIZE)
+    addr = server_sock.getsockname()
+    for i in range(BURSTS):
+        # the connections are completed by the kernel and wait in the
+        # server's backlog until they are accepted
+        clients = []
+        for j in range(BURST_SIZE):
+            sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+            sock.connect(addr)
+            clients.append(sock)
+        start = time.perf_counter()
+        accepted = accept_burst(server_sock, many)
+        elapsed += time.perf_counter() - start
+        for sock, _ in accepted:
+            sock.close()
+        for sock in clients:
+            sock.close()
+    server_sock.close()
+    return elapsed
+
+
+t = threading.Thread(target=lambda: print('%d connections/sec' % (
+    BURSTS * BURST_SIZE / main('many' in sys.argv))))
+t.start()
+t.join()
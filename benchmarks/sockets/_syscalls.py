@@ -0,0 +1,86 @@
+"""Count the system calls that green sockets make in addition to the actual
+socket I/O.
+
+Each ``register``, ``modify`` and ``unregister`` call on the event loop's
+selector is an ``epoll_ctl()`` system call on Linux, and each ``select`` call
+is an ``epoll_wait()``. Each ``setblocking`` call on a socket is an
+``ioctl()`` or ``fcntl()`` system call. The workload is a ping-pong exchange
+of small messages, so that every ``recv()`` has to wait for the peer.
+"""
+import selectors
+import socket as original_socket
+import time
+from collections import Counter
+
+ROUNDS = 1000
+CONCURRENCY = 10
+
+counts = Counter()
+
+
+def count(name, method):
+    def wrapper(*args, **kwargs):
+        counts[name] += 1
+        return method(*args, **kwargs)
+    return wrapper
+
+
+for name in ('register', 'modify', 'unregister', 'select'):
+    setattr(selectors.EpollSelector, name,
+            count(name, getattr(selectors.EpollSelector, name)))
+original_socket.socket.setblocking = count(
+    'setblocking', original_socket.socket.setblocking)
+
+from greenletio import patch_blocking  # noqa: E402
+
+with patch_blocking():
+    import socket
+    import threading
+
+
+def echo(sock):
+    for i in range(ROUNDS):
+        sock.sendall(sock.recv(1))
+    sock.close()
+
+
+def ping(addr):
+    sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+    sock.connect(addr)
+    for i in range(ROUNDS):
+        sock.sendall(b'x')
+        sock.recv(1)
+    sock.close()
+
+
+def accepter(server_sock, pool):
+    for i in range(CONCURRENCY):
+        sock, addr = server_sock.accept()
+        t = threading.Thread(target=echo, args=(sock,))
+        t.start()
+        pool.append(t)
+
+
+def main():
+    threads = []
+    server_sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+    server_sock.bind(('localhost', 0))
+    server_sock.listen(CONCURRENCY)
+    addr = ('localhost', server_sock.getsockname()[1])
+    t = threading.Thread(target=accepter, args=(server_sock, threads))
+    t.start()
+    threads.append(t)
+    for i in range(CONCURRENCY):
+        t = threading.Thread(target=ping, args=(addr,))
+        t.start()
+        threads.append(t)
+    for t in threads:
+        t.join()
+    server_sock.close()
+
+
+now = time.perf_counter()
+main()
+print('time: %f' % (time.perf_counter() - now))
+for name in ('register', 'modify', 'unregister', 'select', 'setblocking'):
+    print('%s: %d' % (name, counts[name]))
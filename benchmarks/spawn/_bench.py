@@ -0,0 +1,37 @@
+import sys
+import threading
+import time
+
+WORKERS = 100000
+
+
+def worker(results, i):
+    # a short-lived worker that yields to the others once
+    time.sleep(0)
+    results[i] = i
+
+
+def run():
+    results = [None] * WORKERS
+    if 'spawn' in sys.argv:
+        from greenletio import spawn
+        tasks = [spawn(worker, results, i) for i in range(WORKERS)]
+        for task in tasks:
+            task.join()
+    else:
+        threads = [threading.Thread(target=worker, args=(results, i))
+                   for i in range(WORKERS)]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+    assert results[-1] == WORKERS - 1
+
+
+def main():
+    now = time.perf_counter()
+    run()
+    print('%f' % (time.perf_counter() - now))
+
+
+main()
@@ -0,0 +1,26 @@
+import asyncio
+import time
+
+WORKERS = 100000
+
+
+async def worker(results, i):
+    await asyncio.sleep(0)
+    results[i] = i
+
+
+async def run():
+    results = [None] * WORKERS
+    tasks = [asyncio.create_task(worker(results, i)) for i in range(WORKERS)]
+    for task in tasks:
+        await task
+    assert results[-1] == WORKERS - 1
+
+
+def main():
+    now = time.perf_counter()
+    asyncio.run(run())
+    print('%f' % (time.perf_counter() - now))
+
+
+main()
@@ -0,0 +1,64 @@
+import os
+import sys
+import time
+import socket
+import ssl
+import threading
+
+TOTAL = 20 * 1024 * 1024
+LINE = b'x' * 99 + b'\n'
+CERTS = os.path.join(os.path.dirname(__file__), '..', '..', 'tests')
+
+
+def server(server_sock, bio):
+    context = ssl.create_default_context(ssl.Purpose.CLIENT_AUTH)
+    context.load_cert_chain(os.path.join(CERTS, 'server.crt'),
+                            os.path.join(CERTS, 'server.key'))
+    if bio:
+        context.sslsocket_class = ssl.MemoryBIOSocket
+    sock, addr = server_sock.accept()
+    sock = context.wrap_socket(sock, server_side=True)
+    data = LINE * (64 * 1024 // len(LINE))
+    sent = 0
+    while sent < TOTAL:
+        sock.sendall(data)
+        sent += len(data)
+    sock.close()
+
+
+def client(addr, mode, bio):
+    context = ssl.create_default_context(
+        ssl.Purpose.SERVER_AUTH, cafile=os.path.join(CERTS, 'server.crt'))
+    if bio:
+        context.sslsocket_class = ssl.MemoryBIOSocket
+    sock = socket.create_connection(addr)
+    sock = context.wrap_socket(sock, server_hostname='example.com')
+    if mode == 'readline':
+        # a protocol parser reading one line at a time
+        f = sock.makefile('rb')
+        while f.readline():
+            pass
+    else:
+        # a protocol parser reading small chunks
+        while sock.recv(100):
+            pass
+    sock.close()
+
+
+def main(mode, bio):
+    server_sock = socket.socket()
+    server_sock.bind(('127.0.0.1', 0))
+    server_sock.listen()
+    t1 = threading.Thread(target=server, args=(server_sock, bio))
+    t2 = threading.Thread(target=client,
+                          args=(server_sock.getsockname(), mode, bio))
+    t1.start()
+    t2.start()
+    t1.join()
+    t2.join()
+    server_sock.close()
+
+
+now = time.perf_counter()
+main('readline' if 'readline' in sys.argv else 'recv', 'bio' in sys.argv)
+print('%f' % (time.perf_counter() - now))
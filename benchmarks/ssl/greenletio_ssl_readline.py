@@ -0,0 +1,6 @@
+import sys
+from greenletio import patch_blocking
+
+sys.argv.append('readline')
+with patch_blocking():
+    import _bench  # noqa: F401
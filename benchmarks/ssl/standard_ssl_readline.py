@@ -0,0 +1,4 @@
+import sys
+
+sys.argv.append('readline')
+import _bench  # noqa: F401,E402
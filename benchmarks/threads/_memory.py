@@ -0,0 +1,37 @@
+"""Measure the memory used by green threads.
+
+The script creates 100,000 green threads and reports the memory allocated per
+thread after they are created, and again after they are started and blocked
+waiting on an event.
+"""
+import asyncio
+import tracemalloc
+from greenletio import async_
+from greenletio.green import threading, time
+
+THREADS = 100000
+
+
+def measure(base):
+    return (tracemalloc.get_traced_memory()[0] - base) / THREADS
+
+
+@async_
+def main():
+    event = threading.Event()
+    base = tracemalloc.get_traced_memory()[0]
+    threads = [threading.Thread(target=event.wait) for i in range(THREADS)]
+    print('created: %d bytes per thread' % measure(base))
+    for t in threads:
+        t.start()
+    time.sleep(0)  # let all the threads run until they block
+    print('waiting: %d bytes per thread' % measure(base))
+    event.set()
+    for t in threads:
+        t.join()
+
+
+tracemalloc.start()
+now = time.perf_counter()
+asyncio.run(main())
+print('time: %f' % (time.perf_counter() - now))
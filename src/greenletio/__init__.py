@@ -1,2 +1,4 @@
-from .core import async_, await_  # noqa: F401
+from .core import async_, await_, spawn, GreenletPool, \
+    GreenletTask  # noqa: F401
+from .executor import GreenletExecutor  # noqa: F401
 from .patcher import patch_blocking, patch_psycopg2  # noqa: F401
@@ -1,8 +1,10 @@
 import asyncio
+import collections
 import contextvars
 import functools
 import sys
-from greenlet import greenlet, getcurrent
+import time
+from greenlet import greenlet, getcurrent, GreenletExit
 
 
 class GreenletBridge:
@@ -56,7 +58,104 @@ class GreenletBridge:
 bridge = GreenletBridge()
 
 
-def async_(fn=None, *, with_context=False):
+class _PoolResult:
+    __slots__ = ('value', 'exc')
+
+    def __init__(self, value=None, exc=None):
+        self.value = value
+        self.exc = exc
+
+
+class GreenletPool:
+    """A pool of idle greenlets that are reused by ``async_`` functions.
+
+    Creating a greenlet for each call to an ``async_`` function can be
+    expensive when the function is called very often. Functions that are
+    given a pool run in a greenlet taken from it, and the greenlet is
+    returned to the pool when the function ends. Example::
+
+        pool = GreenletPool(max_size=50)
+
+        @async_(pool=pool)
+        def fn():
+            pass
+
+    Each function starts with a clean context, and does not see the thread
+    local data or the ``current_thread()`` object of the function that ran
+    in the greenlet before it.
+
+    A pool can only be used from the thread that created it.
+
+    :param max_size: the maximum number of idle greenlets kept in the pool.
+                     Greenlets that are released when the pool is full are
+                     discarded.
+    :param idle_timeout: the number of seconds after which an idle greenlet is
+                         evicted from the pool, or ``None`` to keep idle
+                         greenlets indefinitely.
+    """
+    def __init__(self, max_size=100, idle_timeout=60):
+        self.max_size = max_size
+        self.idle_timeout = idle_timeout
+        self.idle = collections.deque()
+
+    @staticmethod
+    def _worker(fn, args, kwargs):
+        while True:
+            try:
+                result = _PoolResult(value=fn(*args, **kwargs))
+            except GreenletExit:
+                # the greenlet is being discarded
+                raise
+            except:  # noqa: E722
+                result = _PoolResult(exc=sys.exc_info()[1])
+            fn = args = kwargs = None
+            # report the result and wait for the next function to run
+            fn, args, kwargs = getcurrent().parent.switch(result)
+
+    @staticmethod
+    def _discard(gl):
+        # the parent of an idle greenlet is the greenlet that last took it
+        # from the pool, so it has to be changed for the greenlet to return
+        # here when it exits
+        gl.parent = getcurrent()
+        gl.throw()
+
+    def _evict(self):
+        if self.idle_timeout is None:
+            return
+        expired = time.monotonic() - self.idle_timeout
+        while self.idle and self.idle[0][1] < expired:
+            self._discard(self.idle.popleft()[0])
+
+    def get(self):
+        """Return an idle greenlet, or a new one if the pool is empty."""
+        self._evict()
+        if self.idle:
+            gl = self.idle.pop()[0]
+            gl.parent = getcurrent()
+            return gl
+        return greenlet(self._worker)
+
+    def put(self, gl):
+        """Return a greenlet to the pool."""
+        # start the next function with a clean context, and without the
+        # attributes that the previous one stored in the greenlet, such as
+        # the dummy thread and the thread local data of green threading
+        gl.gr_context = None
+        gl.__dict__.clear()
+        if len(self.idle) < self.max_size:
+            self.idle.append((gl, time.monotonic()))
+        else:
+            self._discard(gl)
+        self._evict()
+
+    def clear(self):
+        """Discard all the idle greenlets in the pool."""
+        while self.idle:
+            self._discard(self.idle.pop()[0])
+
+
+def async_(fn=None, *, with_context=False, pool=None):
     """Convert a standard function to an async function that can be awaited.
 
     This function creates an async wrapper for a standard function, allowing
@@ -84,18 +183,44 @@ def async_(fn=None, *, with_context=False):
         def fn():
             pass
 
+    To reduce the cost of creating a greenlet on each call, a
+    :class:`GreenletPool` can be given in the ``pool`` option::
+
+        pool = GreenletPool()
+
+        @async_(pool=pool)
+        def fn():
+            pass
+
     :param fn: the standard function to convert to async.
+    :param with_context: if ``True``, the function runs in a copy of the
+                         caller's context, and the changes it makes to context
+                         variables are applied back to the caller.
+    :param pool: a :class:`GreenletPool` instance from where greenlets are
+                 obtained, or ``None`` to create a new greenlet on each call.
     """
     if fn is None:
-        return lambda fn: async_(fn, with_context=with_context)
+        return lambda fn: async_(fn, with_context=with_context, pool=pool)
 
     @functools.wraps(fn)
     async def decorator(*args, **kwargs):
-        gl = greenlet(fn)
+        if pool is None:
+            gl = greenlet(fn)
+        else:
+            gl = pool.get()
 
         async def run():
-            coro = gl.switch(*args, **kwargs)
+            if pool is None:
+                coro = gl.switch(*args, **kwargs)
+            else:
+                coro = gl.switch(fn, args, kwargs)
             while gl:
+                if coro.__class__ is _PoolResult:
+                    # a pooled greenlet finished running the function
+                    pool.put(gl)
+                    if coro.exc is not None:
+                        raise coro.exc
+                    return coro.value
                 try:
                     result = await coro
                 except:  # noqa: E722
@@ -107,13 +232,13 @@ def async_(fn=None, *, with_context=False):
             return coro  # pragma: no cover
 
         if with_context:
-            gl.gr_context = contextvars.copy_context()
+            context = gl.gr_context = contextvars.copy_context()
             try:
                 result = await run()
             finally:
                 # restore the context
-                for var in gl.gr_context:
-                    var.set(gl.gr_context[var])
+                for var in context:
+                    var.set(context[var])
         else:
             result = await run()
 
@@ -146,13 +271,13 @@ def await_(coro_or_fn):
     :param coro_or_fn: The coroutine or future to await, or when used as a
                        decorator, the async function to decorate.
     """
+    if asyncio.isfuture(coro_or_fn) and coro_or_fn.done():
+        # the future is already resolved, so there is no need to switch to
+        # the asyncio loop to get its result
+        return coro_or_fn.result()
     if asyncio.iscoroutine(coro_or_fn) or asyncio.isfuture(coro_or_fn):
         # we were given an awaitable --> await it
-        parent = getcurrent().parent or bridge.start()
-        if parent == getcurrent():
-            raise RuntimeError(
-                'await_ cannot be called from the asyncio task')
-        return parent.switch(coro_or_fn)
+        return _switch_to_loop(coro_or_fn)
     else:
         # assume decorator usage
         @functools.wraps(coro_or_fn)
@@ -160,3 +285,136 @@ def await_(coro_or_fn):
             return await_(coro_or_fn(*args, **kwargs))
 
         return decorator
+
+
+def _switch_to_loop(awaitable):
+    # give an awaitable to the greenlet that runs the asyncio loop, and
+    # return its result
+    current = getcurrent()
+    parent = current.parent or bridge.start()
+    if parent == current:
+        raise RuntimeError(
+            'await_ cannot be called from the asyncio task')
+    return parent.switch(awaitable)
+
+
+class _Yield:
+    # an awaitable that gives control to the loop for a single iteration with
+    # a bare yield, without the overhead of a coroutine, a timer or a future
+    __slots__ = ()
+
+    def __await__(self):
+        yield
+
+
+_yield = _Yield()
+
+
+async def _run_greenlet(fn, args, kwargs):
+    # a lighter version of async_ for functions that run as a task, which
+    # drives the greenlet from the task's own coroutine
+    gl = greenlet(fn)
+    coro = gl.switch(*args, **kwargs)
+    while gl:
+        try:
+            result = await coro
+        except:  # noqa: E722
+            coro = gl.throw(*sys.exc_info())
+        else:
+            coro = gl.switch(result)
+    return coro
+
+
+def _wake(fut, result=None):
+    if not fut.done():
+        fut.set_result(result)
+
+
+def _wait_tasks(tasks, timeout=None):
+    # wait until all the tasks are done, or the timeout expires, with a
+    # single wake up of the caller
+    pending = [task for task in tasks if not task.done()]
+    if not pending:
+        return
+    loop = pending[0].get_loop()
+    fut = loop.create_future()
+    remaining = len(pending)
+
+    def task_done(task):
+        nonlocal remaining
+        remaining -= 1
+        if remaining == 0:
+            _wake(fut)
+
+    for task in pending:
+        task.add_done_callback(task_done)
+    timer = None
+    if timeout is not None:
+        timer = loop.call_later(timeout, _wake, fut)
+    try:
+        await_(fut)
+    finally:
+        if timer is not None:
+            timer.cancel()
+        # callers that poll with a short timeout must not leave callbacks
+        # behind on the tasks they wait for
+        for task in pending:
+            task.remove_done_callback(task_done)
+
+
+class GreenletTask:
+    """A handle to a function started with :func:`spawn`.
+
+    :param task: the asyncio task that runs the function.
+    """
+    __slots__ = ('task',)
+
+    def __init__(self, task):
+        self.task = task
+
+    def done(self):
+        """Return ``True`` if the function has ended."""
+        return self.task.done()
+
+    def join(self, timeout=None):
+        """Wait for the function to end, and return its result.
+
+        If the function raised an exception, the exception is raised again
+        here.
+
+        :param timeout: the maximum number of seconds to wait, or ``None`` to
+                        wait until the function ends. ``TimeoutError`` is
+                        raised if the function is still running when the
+                        timeout expires.
+        """
+        if not self.task.done():
+            _wait_tasks([self.task], timeout)
+            if not self.task.done():
+                raise TimeoutError('timed out')
+        return self.task.result()
+
+
+def spawn(fn, *args, **kwargs):
+    """Run a standard function concurrently, in its own greenlet.
+
+    This is a lightweight alternative to starting a green thread, which runs
+    the function in a single asyncio task. Example::
+
+        def fn(arg):
+            return arg * 2
+
+        task = spawn(fn, 21)
+        result = task.join()
+
+    :param fn: the function to run.
+    :param args: the positional arguments to pass to the function.
+    :param kwargs: the keyword arguments to pass to the function.
+
+    The return value is a :class:`GreenletTask` handle.
+    """
+    try:
+        loop = asyncio.get_event_loop()
+    except RuntimeError:  # pragma: no cover
+        loop = asyncio.new_event_loop()
+        asyncio.set_event_loop(loop)
+    return GreenletTask(loop.create_task(_run_greenlet(fn, args, kwargs)))
@@ -0,0 +1,178 @@
+import collections
+import concurrent.futures
+import itertools
+import time
+from concurrent.futures._base import PENDING
+from greenletio.green import queue, threading
+
+
+class _Future(concurrent.futures.Future):
+    # a future that waits for its result without blocking the loop
+    def __init__(self):
+        # the future never acquires its lock recursively, so it does not need
+        # to pay for the ownership checks of a reentrant lock
+        self._condition = threading.Condition(threading.Lock())
+        self._state = PENDING
+        self._result = None
+        self._exception = None
+        self._waiters = []
+        self._done_callbacks = []
+
+
+class _WorkItem:
+    __slots__ = ('future', 'fn', 'args', 'kwargs')
+
+    def __init__(self, future, fn, args, kwargs):
+        self.future = future
+        self.fn = fn
+        self.args = args
+        self.kwargs = kwargs
+
+    def run(self):
+        if not self.future.set_running_or_notify_cancel():
+            return
+        try:
+            result = self.fn(*self.args, **self.kwargs)
+        except BaseException as exc:
+            self.future.set_exception(exc)
+            self = None  # break a reference cycle with the exception
+        else:
+            self.future.set_result(result)
+
+
+class GreenletExecutor(concurrent.futures.Executor):
+    """An executor that runs functions in green threads.
+
+    This class has the interface of the ``ThreadPoolExecutor`` class from the
+    Python standard library, but the submitted functions run in green threads
+    on the asyncio loop, so they can use the non-blocking functions from
+    greenletio. The futures that are returned can be waited on with their
+    ``result()`` and ``exception()`` methods without blocking the loop.
+    Example::
+
+        with GreenletExecutor(max_workers=10) as executor:
+            for page in executor.map(download, urls):
+                pass
+
+    The executor must be used from a green thread or an ``async_`` function.
+
+    :param max_workers: the maximum number of functions that run
+                        concurrently.
+    :param queue_size: the maximum number of submitted functions that wait
+                       for a free worker. When the queue is full ``submit()``
+                       waits until there is room in it, so that producers
+                       cannot get too far ahead of the workers. Use ``0`` for
+                       an unbounded queue.
+    :param thread_name_prefix: the prefix for the names of the worker threads.
+    """
+    def __init__(self, max_workers=100, queue_size=None,
+                 thread_name_prefix=''):
+        if max_workers <= 0:
+            raise ValueError('max_workers must be greater than 0')
+        if queue_size is None:
+            queue_size = max_workers * 2
+        self._max_workers = max_workers
+        self._work_queue = queue.Queue(maxsize=queue_size)
+        self._threads = set()
+        self._idle = 0
+        self._shutdown = False
+        self._thread_name_prefix = thread_name_prefix or \
+            'GreenletExecutor-%d' % id(self)
+
+    def _worker(self):
+        while True:
+            item = self._work_queue.get()
+            if item is None:
+                # pass the exit request on to the remaining workers
+                self._work_queue.put(None)
+                return
+            item.run()
+            del item
+            self._idle += 1
+
+    def _adjust_thread_count(self):
+        # each submitted function claims an idle worker, and new workers are
+        # started when there are none
+        if self._idle:
+            self._idle -= 1
+        elif len(self._threads) < self._max_workers:
+            t = threading.Thread(
+                target=self._worker,
+                name='%s_%d' % (self._thread_name_prefix, len(self._threads)))
+            t.start()
+            self._threads.add(t)
+
+    def submit(self, fn, *args, **kwargs):
+        if self._shutdown:
+            raise RuntimeError('cannot schedule new futures after shutdown')
+        future = _Future()
+        self._adjust_thread_count()
+        self._work_queue.put(_WorkItem(future, fn, args, kwargs))
+        return future
+
+    submit.__doc__ = concurrent.futures.Executor.submit.__doc__
+
+    def map(self, fn, *iterables, timeout=None, chunksize=1, prefetch=None):
+        """Return an iterator equivalent to ``map(fn, *iterables)``.
+
+        The results are returned in order, as they become available. Only
+        ``prefetch`` calls are submitted ahead of the result that is being
+        waited on, so the iterables can be very long, or even infinite.
+
+        :param fn: the function to call.
+        :param iterables: the iterables that provide the arguments.
+        :param timeout: the maximum number of seconds to wait for the
+                        results, measured from the call to ``map()``.
+        :param chunksize: ignored, accepted for compatibility with the
+                          standard library executors.
+        :param prefetch: the maximum number of calls that are submitted
+                         ahead of the result that is being waited on. The
+                         default is twice the number of workers.
+        """
+        if prefetch is None:
+            prefetch = self._max_workers * 2
+        if prefetch < 1:
+            raise ValueError('prefetch must be greater than 0')
+        end_time = None
+        if timeout is not None:
+            end_time = timeout + time.monotonic()
+        args_iter = zip(*iterables)
+        futures = collections.deque(
+            self.submit(fn, *args)
+            for args in itertools.islice(args_iter, prefetch))
+
+        def result_iterator():
+            try:
+                while futures:
+                    future = futures.popleft()
+                    # keep the window full while waiting for this result
+                    for args in itertools.islice(args_iter, 1):
+                        futures.append(self.submit(fn, *args))
+                    if end_time is None:
+                        yield future.result()
+                    else:
+                        yield future.result(end_time - time.monotonic())
+                    del future
+            finally:
+                for future in futures:
+                    future.cancel()
+
+        return result_iterator()
+
+    def shutdown(self, wait=True, *, cancel_futures=False):
+        self._shutdown = True
+        if cancel_futures:
+            while True:
+                try:
+                    item = self._work_queue.get_nowait()
+                except queue.Empty:
+                    break
+                if item is not None:  # pragma: no branch
+                    item.future.cancel()
+        if self._threads:
+            self._work_queue.put(None)
+        if wait:
+            for t in self._threads:
+                t.join()
+
+    shutdown.__doc__ = concurrent.futures.Executor.shutdown.__doc__
@@ -0,0 +1,264 @@
+import asyncio
+import collections
+import heapq
+import types
+from greenletio.core import await_
+from greenletio.green import threading as _green_threading_
+from greenletio.patcher import copy_globals
+from queue import Empty, Full
+import queue as _original_queue_
+
+copy_globals(_original_queue_, globals())
+
+_timed_out = object()
+_shut_down = object()
+
+
+def _expire(fut):
+    if not fut.done():
+        fut.set_result(_timed_out)
+
+
+def _wait(fut, timeout, exc_class):
+    timer = None
+    if timeout is not None:
+        timer = fut.get_loop().call_later(timeout, _expire, fut)
+    try:
+        result = await_(fut)
+    finally:
+        if timer is not None:
+            timer.cancel()
+    if result is _timed_out:
+        raise exc_class
+    if result is _shut_down:
+        raise _original_queue_.ShutDown
+    return result
+
+
+class Queue:
+    def __init__(self, maxsize=0):
+        self.maxsize = maxsize
+        self._init(maxsize)
+        self._getters = collections.deque()
+        self._putters = collections.deque()
+        self.unfinished_tasks = 0
+        self.is_shutdown = False
+        # greenlets are not preempted, so the queue does not need a lock for
+        # its own operations. The lock and the conditions are provided for
+        # compatibility with code that uses them to inspect or modify the
+        # queue, and they are notified as in the standard queue, but only
+        # when someone is waiting on them.
+        self.mutex = _green_threading_.Lock()
+        self.not_empty = _green_threading_.Condition(self.mutex)
+        self.not_full = _green_threading_.Condition(self.mutex)
+        self.all_tasks_done = _green_threading_.Condition(self.mutex)
+
+    def task_done(self):
+        if self.unfinished_tasks <= 0:
+            raise ValueError('task_done() called too many times')
+        self.unfinished_tasks -= 1
+        if self.unfinished_tasks == 0:
+            with self.all_tasks_done:
+                self.all_tasks_done.notify_all()
+
+    def join(self):
+        with self.all_tasks_done:
+            while self.unfinished_tasks:
+                self.all_tasks_done.wait()
+
+    def qsize(self):
+        return self._qsize()
+
+    def empty(self):
+        return not self._qsize()
+
+    def full(self):
+        return 0 < self.maxsize <= self._qsize()
+
+    def _notify(self, condition):
+        if condition._waiters:
+            with condition:
+                condition.notify()
+
+    def put(self, item, block=True, timeout=None):
+        if self.is_shutdown:
+            raise _original_queue_.ShutDown
+        # a waiting getter implies that the queue is empty, so the item can
+        # be given to it directly
+        while self._getters:
+            fut = self._getters.popleft()
+            if not fut.done():
+                self.unfinished_tasks += 1
+                fut.set_result(item)
+                return
+        if 0 < self.maxsize <= self._qsize():
+            if not block:
+                raise Full
+            if timeout is not None and timeout < 0:
+                raise ValueError("'timeout' must be a non-negative number")
+            # wait for a getter to make room and add the item on our behalf
+            fut = asyncio.get_event_loop().create_future()
+            self._putters.append((fut, item))
+            _wait(fut, timeout, Full)
+            return
+        self._put(item)
+        self.unfinished_tasks += 1
+        self._notify(self.not_empty)
+
+    def _admit_putter(self):
+        # add the item of the first waiting putter to the queue
+        while self._putters:
+            fut, item = self._putters.popleft()
+            if not fut.done():
+                self._put(item)
+                self.unfinished_tasks += 1
+                fut.set_result(None)
+                self._notify(self.not_empty)
+                return True
+        return False
+
+    def get(self, block=True, timeout=None):
+        if self._qsize():
+            item = self._get()
+            if not (self._putters and self._admit_putter()):
+                self._notify(self.not_full)
+            return item
+        if self._putters and self._admit_putter():
+            # the queue was emptied without calling get(), for example with
+            # queue.clear(), so a waiting putter was able to add its item
+            return self._get()
+        if self.is_shutdown:
+            raise _original_queue_.ShutDown
+        if not block:
+            raise Empty
+        if timeout is not None and timeout < 0:
+            raise ValueError("'timeout' must be a non-negative number")
+        fut = asyncio.get_event_loop().create_future()
+        self._getters.append(fut)
+        try:
+            return _wait(fut, timeout, Empty)
+        except asyncio.CancelledError:  # pragma: no cover
+            if fut.done() and not fut.cancelled() and \
+                    fut.result() not in (_timed_out, _shut_down):
+                # an item was handed to us, but we cannot take it anymore
+                self.unfinished_tasks -= 1
+                self.put(fut.result())
+            raise
+
+    def put_nowait(self, item):
+        return self.put(item, block=False)
+
+    def get_nowait(self):
+        return self.get(block=False)
+
+    def _init(self, maxsize):
+        self.queue = collections.deque()
+
+    def _qsize(self):
+        return len(self.queue)
+
+    def _put(self, item):
+        self.queue.append(item)
+
+    def _get(self):
+        return self.queue.popleft()
+
+    if hasattr(_original_queue_, 'ShutDown'):  # pragma: no cover
+        def shutdown(self, immediate=False):
+            self.is_shutdown = True
+            if immediate:
+                while self._qsize():
+                    self._get()
+                    if self.unfinished_tasks > 0:
+                        self.unfinished_tasks -= 1
+                with self.all_tasks_done:
+                    self.all_tasks_done.notify_all()
+            # waiting getters and putters give up with ShutDown
+            waiters = [fut for fut, _ in self._putters]
+            waiters.extend(self._getters)
+            self._putters.clear()
+            self._getters.clear()
+            for fut in waiters:
+                if not fut.done():
+                    fut.set_result(_shut_down)
+            with self.mutex:
+                self.not_empty.notify_all()
+                self.not_full.notify_all()
+
+    if hasattr(_original_queue_.Queue, '__class_getitem__'):
+        __class_getitem__ = classmethod(types.GenericAlias)
+
+
+class PriorityQueue(Queue):
+    def _init(self, maxsize):
+        self.queue = []
+
+    def _qsize(self):
+        return len(self.queue)
+
+    def _put(self, item):
+        heapq.heappush(self.queue, item)
+
+    def _get(self):
+        return heapq.heappop(self.queue)
+
+
+class LifoQueue(Queue):
+    def _init(self, maxsize):
+        self.queue = []
+
+    def _qsize(self):
+        return len(self.queue)
+
+    def _put(self, item):
+        self.queue.append(item)
+
+    def _get(self):
+        return self.queue.pop()
+
+
+class SimpleQueue:
+    def __init__(self):
+        self._queue = collections.deque()
+        self._getters = collections.deque()
+
+    def put(self, item, block=True, timeout=None):
+        while self._getters:
+            fut = self._getters.popleft()
+            if not fut.done():
+                fut.set_result(item)
+                return
+        self._queue.append(item)
+
+    def get(self, block=True, timeout=None):
+        if self._queue:
+            return self._queue.popleft()
+        if not block:
+            raise Empty
+        if timeout is not None and timeout < 0:
+            raise ValueError("'timeout' must be a non-negative number")
+        fut = asyncio.get_event_loop().create_future()
+        self._getters.append(fut)
+        try:
+            return _wait(fut, timeout, Empty)
+        except asyncio.CancelledError:  # pragma: no cover
+            if fut.done() and not fut.cancelled() and \
+                    fut.result() is not _timed_out:
+                # an item was handed to us, but we cannot take it anymore
+                self.put(fut.result())
+            raise
+
+    def put_nowait(self, item):
+        return self.put(item, block=False)
+
+    def get_nowait(self):
+        return self.get(block=False)
+
+    def empty(self):
+        return not self._queue
+
+    def qsize(self):
+        return len(self._queue)
+
+    if hasattr(_original_queue_.SimpleQueue, '__class_getitem__'):
+        __class_getitem__ = classmethod(types.GenericAlias)
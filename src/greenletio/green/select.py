@@ -1,20 +1,138 @@
-from greenletio.io import wait_many
+import time
+import weakref
+from greenletio.io import SelectorState, wait_many
 from greenletio.patcher import copy_globals
 import select as _original_select_
 
 copy_globals(_original_select_, globals())
 
 
+def _fileobj_to_fd(fileobj):
+    if isinstance(fileobj, int):
+        return fileobj
+    return int(fileobj.fileno())
+
+
+def _wait_for_events(get_events, state, read_list, write_list, timeout):
+    # check for events without blocking, and if there are none, wait for the
+    # asyncio loop to report activity before checking again
+    events = get_events()
+    if events or timeout == 0:
+        return events
+    deadline = None
+    if timeout is not None:
+        deadline = time.monotonic() + timeout
+    while not events:
+        if deadline is not None:
+            timeout = deadline - time.monotonic()
+            if timeout <= 0:
+                break
+        state.wait(read_list, write_list, timeout)
+        events = get_events()
+    return events
+
+
 def devpoll():  # pragma: no cover
     raise NotImplementedError("devpoll is not supported")
 
 
-def epoll(sizehint=-1, flags=0):  # pragma: no cover
-    raise NotImplementedError("epoll is not supported")
+if hasattr(_original_select_, 'epoll'):
+    from select import EPOLLIN, EPOLLOUT, EPOLLPRI
+
+    class epoll:
+        def __init__(self, sizehint=-1, flags=0, _epoll=None):
+            self._epoll = _epoll or _original_select_.epoll(sizehint, flags)
+            self._state = SelectorState()
+            weakref.finalize(self, self._state.close)
+
+        @classmethod
+        def fromfd(cls, fd):  # pragma: no cover
+            return cls(_epoll=_original_select_.epoll.fromfd(fd))
+
+        @property
+        def closed(self):
+            return self._epoll.closed
+
+        def close(self):
+            self._state.close()
+            self._epoll.close()
+
+        def fileno(self):
+            return self._epoll.fileno()
+
+        def register(self, fd, eventmask=EPOLLIN | EPOLLPRI | EPOLLOUT):
+            self._epoll.register(fd, eventmask)
+
+        def modify(self, fd, eventmask):
+            self._epoll.modify(fd, eventmask)
+
+        def unregister(self, fd):
+            self._epoll.unregister(fd)
+
+        def poll(self, timeout=None, maxevents=-1):
+            if timeout is not None and timeout < 0:
+                timeout = None
+            # the epoll file descriptor becomes readable when any of the file
+            # descriptors registered with it have events
+            return _wait_for_events(lambda: self._epoll.poll(0, maxevents),
+                                    self._state, [self._epoll.fileno()], [],
+                                    timeout)
+
+        def __enter__(self):
+            return self
+
+        def __exit__(self, *args):
+            self.close()
+else:  # pragma: no cover
+    def epoll(sizehint=-1, flags=0):
+        raise NotImplementedError("epoll is not supported")
+
+
+if hasattr(_original_select_, 'poll'):
+    from select import POLLIN, POLLOUT, POLLPRI
+
+    class _poll:
+        def __init__(self):
+            self._poll = _original_select_.poll()
+            self._fds = {}
+            self._state = SelectorState()
+            # poll objects have no close() method, so the loop registrations
+            # are removed when the object is garbage collected
+            weakref.finalize(self, self._state.close)
+
+        def register(self, fd, eventmask=POLLIN | POLLPRI | POLLOUT):
+            self._poll.register(fd, eventmask)
+            self._fds[_fileobj_to_fd(fd)] = eventmask
+
+        def modify(self, fd, eventmask):
+            self._poll.modify(fd, eventmask)
+            self._fds[_fileobj_to_fd(fd)] = eventmask
+
+        def unregister(self, fd):
+            self._poll.unregister(fd)
+            fd = _fileobj_to_fd(fd)
+            del self._fds[fd]
+            self._state.discard(fd)
 
+        def poll(self, timeout=None):
+            if timeout is not None:
+                if timeout < 0:
+                    timeout = None
+                else:
+                    # the poll() timeout is given in milliseconds
+                    timeout /= 1000
+            read_list = [fd for fd, eventmask in self._fds.items()
+                         if eventmask & (POLLIN | POLLPRI)]
+            write_list = [fd for fd, eventmask in self._fds.items()
+                          if eventmask & POLLOUT]
+            return _wait_for_events(lambda: self._poll.poll(0), self._state,
+                                    read_list, write_list, timeout)
 
-def poll():  # pragma: no cover
-    raise NotImplementedError("poll is not supported")
+    def poll():
+        return _poll()
+else:  # pragma: no cover
+    def poll():
+        raise NotImplementedError("poll is not supported")
 
 
 def kqueue():  # pragma: no cover
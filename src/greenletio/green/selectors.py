@@ -1,4 +1,5 @@
 from greenletio.green import select as green_select
+from greenletio.io import SelectorState
 from greenletio.patcher import copy_globals
 import selectors as _original_selectors_
 
@@ -8,7 +9,39 @@ copy_globals(_original_selectors_, globals())
 class SelectSelector(_original_selectors_.SelectSelector):
     def __init__(self, *args, **kwargs):
         super().__init__(*args, **kwargs)
-        self._select = green_select.select
+        # keep the file descriptors registered with the loop between calls,
+        # alongside any green sockets that wait on them
+        self._state = SelectorState()
+
+    def _select(self, r, w, _, timeout=None):
+        return self._state.wait(r, w, timeout) + ([],)
+
+    def unregister(self, fileobj):
+        key = super().unregister(fileobj)
+        self._state.discard(key.fd)
+        return key
+
+    def close(self):
+        self._state.close()
+        super().close()
 
 
 DefaultSelector = SelectSelector
+
+if hasattr(_original_selectors_, 'PollSelector'):
+    class PollSelector(_original_selectors_.PollSelector):
+        _selector_cls = staticmethod(green_select.poll)
+
+        def close(self):
+            # the file descriptors that are still registered may be closed
+            # after the selector
+            self._selector._state.close()
+            super().close()
+
+    DefaultSelector = PollSelector
+
+if hasattr(_original_selectors_, 'EpollSelector'):
+    class EpollSelector(_original_selectors_.EpollSelector):
+        _selector_cls = green_select.epoll
+
+    DefaultSelector = EpollSelector
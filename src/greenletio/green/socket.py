@@ -1,9 +1,18 @@
+import asyncio
+import collections
+import concurrent.futures
 import errno
+import io
+import itertools
 import os
-from greenletio.io import wait_to_read, wait_to_write
+import time
+from greenletio.core import async_, await_
+from greenletio.io import FdWatcher, _forget
 from greenletio.patcher import copy_globals
 from socket import _GLOBAL_DEFAULT_TIMEOUT, SOCK_STREAM, AF_INET, AF_INET6, \
-    IPV6_V6ONLY, SOL_SOCKET, error, getaddrinfo, _socket, has_ipv6
+    IPV6_V6ONLY, SOL_SOCKET, SO_ERROR, error, gaierror, timeout, _socket, \
+    has_ipv6, inet_pton, AI_NUMERICHOST, NI_NUMERICHOST, NI_NUMERICSERV, \
+    _GiveupOnSendfile
 try:
     from socket import IPPROTO_IPV6
 except ImportError:  # pragma: no cover
@@ -24,10 +33,94 @@ import socket as _original_socket_
 
 copy_globals(_original_socket_, globals())
 
+try:
+    _IOV_MAX = os.sysconf('SC_IOV_MAX')
+except (AttributeError, ValueError, OSError):  # pragma: no cover
+    _IOV_MAX = 16
+
+try:
+    _ExceptionGroup = ExceptionGroup
+except NameError:  # pragma: no cover
+    _ExceptionGroup = None
+
+# size of the buffer used to send files when os.sendfile() cannot be used
+_SENDFILE_BUFFER_SIZE = 64 * 1024
+
+
+def _deadline(sock_timeout):
+    if sock_timeout is None:
+        return None
+    return time.monotonic() + sock_timeout
+
+
+def _wait(wait, sock_timeout, deadline=None):
+    # wait for a socket to be ready, giving up with a timeout error if the
+    # deadline passes. When no deadline is given it is calculated from the
+    # socket's timeout, and it is returned so that it can be used in the next
+    # wait of the same operation.
+    if sock_timeout is None:
+        wait()
+        return None
+    if deadline is None:
+        deadline = time.monotonic() + sock_timeout
+    remaining = deadline - time.monotonic()
+    if remaining <= 0 or not wait(remaining):
+        raise timeout('timed out')
+    return deadline
+
 
 class socket(_original_socket_.socket):
-    def _nonblocking_read(self, method, *args, **kwargs):
-        self.setblocking(False)
+    _watcher = None
+
+    def __init__(self, family=-1, type=-1, proto=-1, fileno=None):
+        super().__init__(family, type, proto, fileno)
+        # the file descriptor is put in non-blocking mode once, and the
+        # timeout requested by the application is tracked separately
+        self._timeout = super().gettimeout()
+        super().setblocking(False)
+
+    @property
+    def timeout(self):
+        return self._timeout
+
+    def gettimeout(self):
+        return self._timeout
+
+    def settimeout(self, value):
+        if value is not None:
+            if value < 0:
+                raise ValueError('Timeout value out of range')
+            value = float(value)
+        self._timeout = value
+
+    def getblocking(self):
+        return self._timeout != 0
+
+    def setblocking(self, flag):
+        self._timeout = None if flag else 0.0
+
+    def _get_watcher(self):
+        if self._watcher is None:
+            self._watcher = FdWatcher(self.fileno(), owner=self)
+        return self._watcher
+
+    def _release_watcher(self):
+        # the file descriptor is about to be closed or detached, so all its
+        # registrations are removed, including those made by selectors
+        if self._watcher is not None:
+            self._watcher.close()
+            self._watcher = None
+        _forget(self.fileno())
+
+    def _real_close(self, *args, **kwargs):
+        self._release_watcher()
+        super()._real_close(*args, **kwargs)
+
+    def detach(self):
+        self._release_watcher()
+        return super().detach()
+
+    def _nonblocking_read(self, method, *args, deadline=None, **kwargs):
         while True:
             try:
                 ret = method(*args, **kwargs)
@@ -35,13 +128,15 @@ class socket(_original_socket_.socket):
             except (OSError, BlockingIOError) as exc:
                 err = exc.errno
                 if err in (errno.EAGAIN, errno.EWOULDBLOCK):
-                    wait_to_read(self.fileno())
+                    if self._timeout == 0:
+                        raise
+                    deadline = _wait(self._get_watcher().wait_to_read,
+                                     self._timeout, deadline)
                 else:  # pragma: no cover
                     raise
         return ret
 
-    def _nonblocking_write(self, method, *args, **kwargs):
-        self.setblocking(False)
+    def _nonblocking_write(self, method, *args, deadline=None, **kwargs):
         while True:
             try:
                 ret = method(*args, **kwargs)
@@ -50,8 +145,16 @@ class socket(_original_socket_.socket):
                 err = exc.errno
                 ret = None
                 if err in (errno.EAGAIN, errno.EWOULDBLOCK, errno.EINPROGRESS):
-                    wait_to_write(self.fileno())
-                    if err == errno.EINPROGRESS:  # pragma: no cover
+                    if self._timeout == 0:
+                        raise
+                    deadline = _wait(self._get_watcher().wait_to_write,
+                                     self._timeout, deadline)
+                    if err == errno.EINPROGRESS:
+                        # the connection attempt has ended, but it may have
+                        # failed
+                        err = self.getsockopt(SOL_SOCKET, SO_ERROR)
+                        if err:
+                            raise OSError(err, os.strerror(err)) from None
                         break
                 elif err == errno.EISCONN:  # pragma: no cover
                     # the errors on Windows are slightly different and
@@ -63,18 +166,54 @@ class socket(_original_socket_.socket):
                     raise
         return ret
 
-    def accept(self, *args, **kwargs):
-        wait_to_read(self.fileno())
-        conn, address = self._nonblocking_read(super().accept, *args, **kwargs)
-        conn.setblocking(False)
-        fd = conn.detach()
-        return socket(fileno=fd), address
+    def _accepted(self, fd):
+        # create the socket object for an accepted connection. Subclasses
+        # that need to wrap their connections override this method, so that
+        # accept() and accept_many() return the same kind of sockets.
+        return socket(self.family, self.type, self.proto, fileno=fd)
+
+    def accept(self):
+        fd, address = self._nonblocking_read(self._accept)
+        return self._accepted(fd), address
+
+    def accept_many(self, max_n=64):
+        """Accept up to ``max_n`` connections.
+
+        This is an extension to the standard socket interface. The method
+        waits for a connection in the same way as :meth:`accept`, and then
+        accepts the connections that are already waiting in the backlog
+        without waiting again. The return value is a list of
+        ``(socket, address)`` tuples.
+        """
+        conns = [self.accept()]
+        while len(conns) < max_n:
+            try:
+                fd, address = self._accept()
+            except OSError:
+                # the backlog is empty, or accepting failed for some other
+                # reason, which will be reported by the next call
+                break
+            try:
+                conns.append((self._accepted(fd), address))
+            except OSError:
+                # setting up this connection failed, for example in a TLS
+                # handshake, so it is dropped without losing the others
+                continue
+        return conns
 
     def connect(self, *args, **kwargs):
         return self._nonblocking_write(super().connect, *args, **kwargs)
 
-    def connect_ex(self, *args, **kwargs):  # pragma: no cover
-        return self._nonblocking_write(super().connect_ex, *args, **kwargs)
+    def connect_ex(self, address):
+        try:
+            self.connect(address)
+        except timeout:
+            return errno.EAGAIN
+        except gaierror:  # pragma: no cover
+            raise
+        except OSError as exc:
+            return exc.errno
+        return 0
 
     def recv(self, *args, **kwargs):
         return self._nonblocking_read(super().recv, *args, **kwargs)
@@ -98,71 +237,341 @@ class socket(_original_socket_.socket):
         return self._nonblocking_write(super().send, *args, **kwargs)
 
     def sendall(self, data, flags=0):
-        tail = self.send(data, flags)
-        len_data = len(data)
-        while tail < len_data:  # pragma: no cover
-            tail += self.send(data[tail:], flags)
+        # slices of a memoryview do not copy the data that remains to be sent
+        with memoryview(data) as view, view.cast('B') as byte_view:
+            len_data = len(byte_view)
+            # the timeout applies to the whole operation
+            deadline = _deadline(self._timeout)
+            tail = self._nonblocking_write(super().send, byte_view, flags,
+                                           deadline=deadline)
+            while tail < len_data:
+                tail += self._nonblocking_write(
+                    super().send, byte_view[tail:], flags, deadline=deadline)
+
+    def sendall_vectored(self, buffers, flags=0):
+        """Send a sequence of buffers, as if they were concatenated.
+
+        This is an extension to the standard socket interface. The buffers are
+        given to the kernel together in a single ``sendmsg()`` call whenever
+        possible, so that for example a header and a body can be sent without
+        concatenating them first.
+        """
+        views = [memoryview(buffer).cast('B') for buffer in buffers]
+        if not hasattr(_original_socket_.socket,
+                       'sendmsg'):  # pragma: no cover
+            for view in views:
+                self.sendall(view, flags)
+            return
+        deadline = _deadline(self._timeout)
+        first = 0
+        while first < len(views):
+            sent = self._nonblocking_write(
+                super().sendmsg, views[first:first + _IOV_MAX], (), flags,
+                deadline=deadline)
+            # skip the buffers that were sent completely, and trim the one
+            # that was sent partially
+            while first < len(views) and sent >= len(views[first]):
+                sent -= len(views[first])
+                first += 1
+            if sent:
+                views[first] = views[first][sent:]
 
     def sendto(self, *args, **kwargs):
         return self._nonblocking_write(super().sendto, *args, **kwargs)
 
-    def sendmsg(self, *args, **kwargs):  # pragma: no cover
+    def sendmsg(self, *args, **kwargs):
         return self._nonblocking_write(super().sendmsg, *args, **kwargs)
 
     def sendmsg_afalg(self, *args, **kwargs):  # pragma: no cover
         return self._nonblocking_write(super().sendmsg_afalg, *args, **kwargs)
 
-    def sendfile(self, *args, **kwargs):  # pragma: no cover
-        raise RuntimeError('socket.sendfile is not supported')
+    # the sendfile() method of the standard socket class calls the two methods
+    # below, which are adapted from the standard library so that they wait
+    # for the socket to be writable without blocking the loop
+
+    def _sendfile_use_sendfile(self, file, offset=0, count=None):
+        if not hasattr(os, 'sendfile'):  # pragma: no cover
+            raise _GiveupOnSendfile(
+                'os.sendfile() not available on this platform')
+        self._check_sendfile_params(file, offset, count)
+        sockno = self.fileno()
+        try:
+            fileno = file.fileno()
+            fsize = os.fstat(fileno).st_size
+        except (AttributeError, io.UnsupportedOperation, OSError) as err:
+            raise _GiveupOnSendfile(err)  # not a regular file
+        if not fsize:
+            return 0  # empty file
+        # truncate to 1GiB to avoid OverflowError, see bpo-38319
+        blocksize = min(count or fsize, 2 ** 30)
+        if self._timeout == 0:
+            raise ValueError('non-blocking sockets are not supported')
+        total_sent = 0
+        try:
+            while True:
+                if count:
+                    blocksize = count - total_sent
+                    if blocksize <= 0:
+                        break
+                try:
+                    sent = os.sendfile(sockno, fileno, offset, blocksize)
+                except BlockingIOError:
+                    _wait(self._get_watcher().wait_to_write, self._timeout)
+                    continue
+                except OSError as err:  # pragma: no cover
+                    if total_sent == 0:
+                        # the file cannot be used with sendfile(), so the
+                        # caller falls back to send()
+                        raise _GiveupOnSendfile(err)
+                    raise err from None
+                if sent == 0:
+                    break  # EOF
+                offset += sent
+                total_sent += sent
+            return total_sent
+        finally:
+            if total_sent > 0 and hasattr(file, 'seek'):
+                file.seek(offset)
+
+    def _sendfile_use_send(self, file, offset=0, count=None):
+        self._check_sendfile_params(file, offset, count)
+        if self._timeout == 0:
+            raise ValueError('non-blocking sockets are not supported')
+        if offset:
+            file.seek(offset)
+        blocksize = min(count, _SENDFILE_BUFFER_SIZE) if count \
+            else _SENDFILE_BUFFER_SIZE
+        total_sent = 0
+        # when the file supports it, it is read into the same buffer for each
+        # block, instead of allocating a new bytes object every time
+        readinto = getattr(file, 'readinto', None)
+        buffer = memoryview(bytearray(blocksize)) if readinto else None
+        try:
+            while True:
+                if count:
+                    blocksize = min(count - total_sent, blocksize)
+                    if blocksize <= 0:
+                        break
+                if buffer is not None:
+                    n = readinto(buffer[:blocksize])
+                    data = buffer[:n]
+                else:
+                    data = file.read(blocksize)
+                    n = len(data)
+                if not n:
+                    break  # EOF
+                self.sendall(data)
+                total_sent += n
+            return total_sent
+        finally:
+            if total_sent > 0 and hasattr(file, 'seek'):
+                file.seek(offset + total_sent)
+            if buffer is not None:
+                buffer.release()
+
 
+def socketpair(*args, **kwargs):
+    # the sockets are created by the standard function, and then their file
+    # descriptors are transferred to green sockets
+    a, b = _original_socket_.socketpair(*args, **kwargs)
+    return (socket(a.family, a.type, a.proto, a.detach()),
+            socket(b.family, b.type, b.proto, b.detach()))
 
-# The create_connection and create_server functions below are identical copies
-# to those in the Python 3.8. They are included here to ensure they
-# instantiate the green versions of the socket class.
 
-def create_connection(address, timeout=_GLOBAL_DEFAULT_TIMEOUT,
-                      source_address=None):  # pragma: no cover
-    """Connect to *address* and return the socket object.
-    Convenience function.  Connect to *address* (a 2-tuple ``(host,
-    port)``) and return the socket object.  Passing the optional
-    *timeout* parameter will set the timeout on the socket instance
-    before attempting to connect.  If no *timeout* is supplied, the
-    global default timeout setting returned by :func:`getdefaulttimeout`
-    is used.  If *source_address* is set it must be a tuple of (host, port)
-    for the socket to bind as a source address before making the connection.
-    A host of '' or port 0 tells the OS to use the default.
+class _Resolver:
+    """Name resolution that does not block the loop.
+
+    The blocking resolver functions from the standard library run in a small
+    pool of threads, and their results are cached for ``ttl`` seconds, with
+    the least recently used entries evicted when the cache has more than
+    ``cache_size`` entries. Failed lookups are not cached.
     """
+    def __init__(self, max_workers=4, cache_size=256, ttl=60):
+        self.max_workers = max_workers
+        self.cache_size = cache_size
+        self.ttl = ttl
+        self.executor = None
+        self.cache = collections.OrderedDict()
 
-    host, port = address
-    err = None
-    for res in getaddrinfo(host, port, 0, SOCK_STREAM):
-        af, socktype, proto, canonname, sa = res
-        sock = None
+    def resolve(self, fn, *args):
+        key = (fn,) + args
+        entry = self.cache.get(key)
+        if entry is not None:
+            expiration, result = entry
+            if expiration > time.monotonic():
+                self.cache.move_to_end(key)
+                return result
+            del self.cache[key]
+        if self.executor is None:
+            self.executor = concurrent.futures.ThreadPoolExecutor(
+                self.max_workers, thread_name_prefix='greenletio-resolver')
+        result = await_(asyncio.get_event_loop().run_in_executor(
+            self.executor, fn, *args))
+        self.cache[key] = (time.monotonic() + self.ttl, result)
+        if len(self.cache) > self.cache_size:
+            self.cache.popitem(last=False)
+        return result
+
+    def clear(self):
+        self.cache.clear()
+
+
+_resolver = _Resolver()
+
+
+def _is_numeric_host(host):
+    # numeric addresses are converted without network access, so they do not
+    # need to go through the resolver
+    if host is None:
+        return True
+    if isinstance(host, bytes):
+        host = host.decode('ascii', 'replace')
+    host = host.split('%', 1)[0]  # IPv6 scope
+    for family in (AF_INET, AF_INET6):
         try:
-            sock = socket(af, socktype, proto)
-            if timeout is not _GLOBAL_DEFAULT_TIMEOUT:
-                sock.settimeout(timeout)
-            if source_address:
-                sock.bind(source_address)
-            sock.connect(sa)
-            # Break explicitly a reference cycle
-            err = None
-            return sock
+            inet_pton(family, host)
+            return True
+        except (OSError, ValueError):
+            pass
+    return False
+
+
+def getaddrinfo(host, port, family=0, type=0, proto=0, flags=0):
+    if flags & AI_NUMERICHOST or _is_numeric_host(host):
+        return _original_socket_.getaddrinfo(host, port, family, type, proto,
+                                             flags)
+    return list(_resolver.resolve(_original_socket_.getaddrinfo, host, port,
+                                  family, type, proto, flags))
+
+
+def gethostbyname(hostname):
+    if _is_numeric_host(hostname):
+        return _original_socket_.gethostbyname(hostname)
+    return _resolver.resolve(_original_socket_.gethostbyname, hostname)
+
+
+def getnameinfo(sockaddr, flags):
+    if flags & NI_NUMERICHOST and flags & NI_NUMERICSERV:
+        return _original_socket_.getnameinfo(sockaddr, flags)
+    return _resolver.resolve(_original_socket_.getnameinfo, sockaddr, flags)
+
+
+def _interleave_addrinfos(addrinfos):
+    # alternate between address families, starting with the family of the
+    # first address, as recommended in RFC 8305
+    by_family = collections.OrderedDict()
+    for addrinfo in addrinfos:
+        by_family.setdefault(addrinfo[0], []).append(addrinfo)
+    return [addrinfo
+            for addrinfos in itertools.zip_longest(*by_family.values())
+            for addrinfo in addrinfos if addrinfo is not None]
+
+
+def _connect(addrinfo, timeout, source_address):
+    af, socktype, proto, canonname, sa = addrinfo
+    sock = socket(af, socktype, proto)
+    try:
+        if timeout is not _GLOBAL_DEFAULT_TIMEOUT:
+            sock.settimeout(timeout)
+        if source_address:
+            sock.bind(source_address)
+        sock.connect(sa)
+        return sock
+    except BaseException:
+        # this includes the cancellation of attempts that lost the race
+        sock.close()
+        raise
+
+
+def _connect_staggered(addrinfos, timeout, source_address, delay):
+    # start a connection attempt in its own greenlet every time the previous
+    # attempt fails or takes longer than the delay, and return the first
+    # socket that connects, along with the errors of the failed attempts
+    loop = asyncio.get_event_loop()
+    connect = async_(_connect)
+    attempts = []
+    pending = set()
+    sock = None
+
+    def wait(timeout):
+        nonlocal pending, sock
+        done, pending = await_(asyncio.wait(
+            pending, timeout=timeout, return_when=asyncio.FIRST_COMPLETED))
+        for attempt in done:
+            if attempt.exception() is None:
+                sock = attempt.result()
+                break
 
-        except error as _:
-            err = _
+    try:
+        for addrinfo in addrinfos:
+            attempt = loop.create_task(
+                connect(addrinfo, timeout, source_address))
+            attempts.append(attempt)
+            pending.add(attempt)
+            wait(delay)
             if sock is not None:
-                sock.close()
+                return sock, []
+        while pending and sock is None:
+            wait(None)
+        if sock is not None:
+            return sock, []
+        return None, [attempt.exception() for attempt in attempts]
+    finally:
+        for attempt in attempts:
+            if not attempt.done():
+                attempt.cancel()
+            elif not attempt.cancelled() and attempt.exception() is None \
+                    and attempt.result() is not sock:  # pragma: no cover
+                # this attempt also connected, but lost the race
+                attempt.result().close()
 
-    if err is not None:
-        try:
-            raise err
-        finally:
-            # Break explicitly a reference cycle
-            err = None
+
+def create_connection(address, timeout=_GLOBAL_DEFAULT_TIMEOUT,
+                      source_address=None, *, all_errors=False,
+                      happy_eyeballs_delay=0.25):
+    """Connect to *address* and return the socket object.
+
+    This is a version of the standard library function that implements the
+    "Happy Eyeballs" algorithm from RFC 8305 when the host resolves to more
+    than one address. The connection attempts are staggered by
+    *happy_eyeballs_delay* seconds, alternating between address families, and
+    the first socket that connects is returned, while the remaining attempts
+    are cancelled. Pass ``None`` as *happy_eyeballs_delay* to try the
+    addresses one at a time.
+
+    When all the connection attempts fail, the error from the first attempt
+    is raised, or when *all_errors* is true, an ``ExceptionGroup`` with the
+    errors from all the attempts.
+    """
+    host, port = address
+    addrinfos = getaddrinfo(host, port, 0, SOCK_STREAM)
+    if not addrinfos:
+        raise error('getaddrinfo returns an empty list')
+    if happy_eyeballs_delay is None or len(addrinfos) == 1:
+        exceptions = []
+        for addrinfo in addrinfos:
+            try:
+                return _connect(addrinfo, timeout, source_address)
+            except error as exc:
+                exceptions.append(exc)
     else:
-        raise error("getaddrinfo returns an empty list")
+        sock, exceptions = _connect_staggered(
+            _interleave_addrinfos(addrinfos), timeout, source_address,
+            happy_eyeballs_delay)
+        if sock is not None:
+            return sock
+    try:
+        if all_errors and _ExceptionGroup is not None:
+            raise _ExceptionGroup('create_connection failed', exceptions)
+        raise exceptions[0]
+    finally:
+        # break explicitly a reference cycle
+        exceptions = None
+
 
+# The create_server function below is an identical copy of the one in Python
+# 3.8. It is included here to ensure it instantiates the green version of the
+# socket class.
 
 def create_server(address, *, family=AF_INET, backlog=None, reuse_port=False,
                   dualstack_ipv6=False):  # pragma: no cover
@@ -1,16 +1,106 @@
+import collections
+import errno
+import io
 import os
 import sys
-from greenletio.io import wait_to_read, wait_to_write
+import time
+from greenletio.green import socket as _green_socket_
+from greenletio.green.socket import _deadline, _wait
+from greenletio.io import FdWatcher, _forget
 from greenletio.patcher import copy_globals
 from ssl import SSLWantReadError, SSLWantWriteError, PROTOCOL_TLS, Purpose, \
-    CERT_NONE, CERT_REQUIRED, _ASN1Object
+    CERT_NONE, CERT_REQUIRED, _ASN1Object, MemoryBIO, SSLEOFError, \
+    SSLZeroReturnError
+from socket import AF_INET, AF_INET6, SOL_SOCKET, SO_ERROR, SO_TYPE, \
+    SOCK_STREAM, timeout, _GiveupOnSendfile
 import ssl as _original_ssl_
 
 copy_globals(_original_ssl_, globals())
 
+# reads smaller than this size decrypt as much data as possible, and keep what
+# was not requested for the reads that follow
+_READ_AHEAD_SIZE = 64 * 1024
+
+
+class SessionCache:
+    """Cache of TLS sessions for client connections.
+
+    Sessions are stored by server hostname and port, so that new connections
+    to a server can resume the last session established with it instead of
+    doing a full handshake. Entries expire after ``ttl`` seconds, or earlier
+    if the session has a shorter lifetime, and the least recently used
+    entries are evicted when the cache has more than ``maxsize`` entries.
+
+    The ``hits`` and ``misses`` attributes count the handshakes in which a
+    session was or was not reused. To use a cache, assign it to the
+    ``session_cache`` attribute of a context::
+
+        context = ssl.create_default_context()
+        context.session_cache = ssl.SessionCache()
+    """
+    def __init__(self, maxsize=256, ttl=3600):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+        self.cache = collections.OrderedDict()
+
+    @property
+    def hit_rate(self):
+        """The fraction of handshakes that resumed a cached session."""
+        total = self.hits + self.misses
+        return self.hits / total if total else 0.0
+
+    def get(self, server_hostname, port):
+        key = (server_hostname, port)
+        entry = self.cache.get(key)
+        if entry is not None:
+            expiration, session = entry
+            if expiration > time.monotonic():
+                self.cache.move_to_end(key)
+                return session
+            del self.cache[key]
+
+    def put(self, server_hostname, port, session):
+        key = (server_hostname, port)
+        ttl = min(self.ttl, session.timeout)
+        self.cache[key] = (time.monotonic() + ttl, session)
+        self.cache.move_to_end(key)
+        if len(self.cache) > self.maxsize:
+            self.cache.popitem(last=False)
+
+    def record(self, reused):
+        if reused:
+            self.hits += 1
+        else:
+            self.misses += 1
+
+    def clear(self):
+        self.cache.clear()
+
+
+def _session_cache(context, server_side, server_hostname, family):
+    # return the session cache used by a client connection, if any. Sessions
+    # are cached by host name and port, so only internet sockets use it.
+    cache = getattr(context, 'session_cache', None)
+    if cache is None or server_side or not server_hostname or \
+            family not in (AF_INET, AF_INET6):
+        return None
+    return cache
+
+
+def _cached_session(context, server_side, server_hostname, family, address):
+    # return the port of a client connection that goes through the session
+    # cache of its context, and the session to resume, if there is one
+    cache = _session_cache(context, server_side, server_hostname, family)
+    if cache is None:
+        return None, None
+    return address[1], cache.get(server_hostname, address[1])
+
 
 class SSLContext(_original_ssl_.SSLContext):
     sslsocket_class = None
+    session_cache = None
 
     def wrap_socket(self, sock, server_side=False,
                     do_handshake_on_connect=True,
@@ -43,7 +133,23 @@ class SSLSocket(_original_ssl_.SSLSocket):
             do_handshake_on_connect = kwargs.get(
                 'do_handshake_on_connect', True)
             kwargs['do_handshake_on_connect'] = False
+            port = None
+            sock = kwargs['sock']
+            # only look up the peer address when it is needed for the cache
+            if kwargs.get('session') is None and _session_cache(
+                    kwargs['context'], kwargs.get('server_side'),
+                    kwargs.get('server_hostname'), sock.family) is not None:
+                try:
+                    address = sock.getpeername()
+                except OSError:
+                    pass
+                else:
+                    port, kwargs['session'] = _cached_session(
+                        kwargs['context'], kwargs.get('server_side'),
+                        kwargs.get('server_hostname'), sock.family, address)
             sock = super(SSLSocket, cls)._create(*args, **kwargs)
+            sock._session_port = port
+            sock._init_nonblocking()
             sock.do_handshake_on_connect = do_handshake_on_connect
             if sock._connected and do_handshake_on_connect:
                 try:
@@ -58,6 +164,7 @@ class SSLSocket(_original_ssl_.SSLSocket):
                 'do_handshake_on_connect', True)
             kwargs['do_handshake_on_connect'] = False
             super().__init__(*args, **kwargs)
+            self._init_nonblocking()
             self.do_handshake_on_connect = do_handshake_on_connect
             if self._connected and do_handshake_on_connect:
                 self.do_handshake_on_connect = True
@@ -67,42 +174,498 @@ class SSLSocket(_original_ssl_.SSLSocket):
                     self.close()
                     raise
 
-    def _nonblocking_io(self, method, *args, **kwargs):
-        self.setblocking(False)
+    _watcher = None
+    _timeout = None
+    _read_buffer = None
+    _session_port = None
+
+    def _init_nonblocking(self):
+        # the file descriptor is put in non-blocking mode once, and the
+        # timeout requested by the application is tracked separately
+        super().setblocking(False)
+
+    @property
+    def timeout(self):
+        return self._timeout
+
+    def gettimeout(self):
+        return self._timeout
+
+    def settimeout(self, value):
+        if value is not None:
+            if value < 0:
+                raise ValueError('Timeout value out of range')
+            value = float(value)
+        self._timeout = value
+
+    def getblocking(self):
+        return self._timeout != 0
+
+    def setblocking(self, flag):
+        self._timeout = None if flag else 0.0
+
+    def _get_watcher(self):
+        if self._watcher is None:
+            self._watcher = FdWatcher(self.fileno(), owner=self)
+        return self._watcher
+
+    def _release_watcher(self):
+        # the file descriptor is about to be closed or detached, so all its
+        # registrations are removed, including those made by selectors
+        if self._watcher is not None:
+            self._watcher.close()
+            self._watcher = None
+        _forget(self.fileno())
+
+    def _handshake_done(self):
+        if self._session_port is not None:
+            cache = self.context.session_cache
+            cache.record(self.session_reused)
+            self._save_session()
+
+    def _save_session(self):
+        # with TLS 1.3 the session tickets arrive after the handshake, so the
+        # session is saved again when the connection is closed
+        if self._session_port is not None and self._sslobj is not None:
+            session = self.session
+            if session is not None:
+                self.context.session_cache.put(
+                    self.server_hostname, self._session_port, session)
+
+    def _real_close(self, *args, **kwargs):
+        self._save_session()
+        self._release_watcher()
+        super()._real_close(*args, **kwargs)
+
+    def detach(self):
+        self._release_watcher()
+        return super().detach()
+
+    def _nonblocking_io(self, method, *args, deadline=None, **kwargs):
         while True:
             try:
                 ret = method(*args, **kwargs)
                 break
             except SSLWantReadError:
-                wait_to_read(self.fileno())
+                if self._timeout == 0:
+                    raise
+                deadline = _wait(self._get_watcher().wait_to_read,
+                                 self._timeout, deadline)
             except SSLWantWriteError:  # pragma: no cover
-                wait_to_write(self.fileno())
+                if self._timeout == 0:
+                    raise
+                deadline = _wait(self._get_watcher().wait_to_write,
+                                 self._timeout, deadline)
         return ret
 
+    def _real_connect(self, addr, connect_ex):
+        # this is a copy of the standard library implementation, modified to
+        # wait for the connection to be established without blocking
+        if self.server_side:  # pragma: no cover
+            raise ValueError("can't connect in server-side mode")
+        if self._connected or \
+                self._sslobj is not None:  # pragma: no cover
+            raise ValueError("attempt to connect already-connected SSLSocket!")
+        if self._session is None:
+            self._session_port, self._session = _cached_session(
+                self.context, False, self.server_hostname, self.family, addr)
+        self._sslobj = self.context._wrap_socket(
+            self, False, self.server_hostname,
+            owner=self, session=self._session
+        )
+        try:
+            rc = super(_original_ssl_.SSLSocket, self).connect_ex(addr)
+            if rc == errno.EINPROGRESS and self._timeout != 0:
+                try:
+                    _wait(self._get_watcher().wait_to_write, self._timeout)
+                except timeout:
+                    if not connect_ex:
+                        raise
+                    rc = errno.EAGAIN
+                else:
+                    rc = self.getsockopt(SOL_SOCKET, SO_ERROR)
+            if rc and not connect_ex:  # pragma: no cover
+                raise OSError(rc, os.strerror(rc))
+            if not rc:
+                self._connected = True
+                if self.do_handshake_on_connect:
+                    self.do_handshake()
+            return rc
+        except (OSError, ValueError):  # pragma: no cover
+            self._sslobj = None
+            raise
+
     def do_handshake(self):
-        return self._nonblocking_io(super().do_handshake)
+        ret = self._nonblocking_io(super().do_handshake)
+        self._handshake_done()
+        return ret
+
+    def accept(self):
+        deadline = None
+        while True:
+            try:
+                return super().accept()
+            except BlockingIOError:
+                if self._timeout == 0:
+                    raise
+                deadline = _wait(self._get_watcher().wait_to_read,
+                                 self._timeout, deadline)
 
-    def accept(self, *args, **kwargs):
-        wait_to_read(self.fileno())
-        return self._nonblocking_io(super().accept, *args, **kwargs)
+    def _buffered_read(self, size, buffer):
+        if buffer is not None:
+            with memoryview(buffer) as view:
+                if size <= 0 or size > view.nbytes:
+                    size = view.nbytes
+        if self._read_buffer is not None:
+            # serve the read from the decrypted data that is buffered
+            if buffer is None:
+                data = self._read_buffer.read(size)
+                if data:
+                    return data
+            else:
+                with memoryview(buffer) as view, view.cast('B') as byte_view:
+                    n = self._read_buffer.readinto(byte_view[:size])
+                if n:
+                    return n
+            self._read_buffer = None
+        if size <= 0 or size >= _READ_AHEAD_SIZE or self._sslobj is None:
+            return self._decrypt(size, buffer)
+        data = self._decrypt(_READ_AHEAD_SIZE)
+        if len(data) > size:
+            self._read_buffer = io.BytesIO(data)
+            return self._buffered_read(size, buffer)
+        if buffer is None:
+            return data
+        with memoryview(buffer) as view, view.cast('B') as byte_view:
+            byte_view[:len(data)] = data
+        return len(data)
 
-    def recv(self, *args, **kwargs):
-        return self._nonblocking_io(super().recv, *args, **kwargs)
+    def _decrypt(self, size, buffer=None):
+        return self._nonblocking_io(super().read, size, buffer)
 
-    def recv_into(self, *args, **kwargs):  # pragma: no cover
-        return self._nonblocking_io(super().recv_into, *args, **kwargs)
+    def read(self, len=1024, buffer=None):
+        # the standard recv(), recv_into() and makefile() methods all read
+        # through this method
+        return self._buffered_read(len, buffer)
+
+    def pending(self):
+        buffered = 0
+        if self._read_buffer is not None:
+            with self._read_buffer.getbuffer() as view:
+                buffered = view.nbytes - self._read_buffer.tell()
+        return buffered + super().pending()
 
     def send(self, *args, **kwargs):
         return self._nonblocking_io(super().send, *args, **kwargs)
 
     def sendall(self, data, flags=0):
-        tail = self.send(data, flags)
-        len_data = len(data)
-        while tail < len_data:  # pragma: no cover
-            tail += self.send(data[tail:], flags)
+        with memoryview(data) as view, view.cast('B') as byte_view:
+            len_data = len(byte_view)
+            # the timeout applies to the whole operation
+            deadline = _deadline(self._timeout)
+            tail = self._nonblocking_io(super().send, byte_view, flags,
+                                        deadline=deadline)
+            while tail < len_data:  # pragma: no cover
+                tail += self._nonblocking_io(
+                    super().send, byte_view[tail:], flags, deadline=deadline)
+
+    def sendall_vectored(self, buffers, flags=0):
+        # the buffers need to be encrypted separately, so there is no
+        # advantage in giving them to the kernel together
+        for buffer in buffers:
+            self.sendall(buffer, flags)
+
+    # the standard sendfile() method uses os.sendfile() when the socket is not
+    # wrapped, and falls back to encrypting the file in blocks otherwise
+    _sendfile_use_sendfile = _green_socket_.socket._sendfile_use_sendfile
+    _sendfile_use_send = _green_socket_.socket._sendfile_use_send
+
+
+class MemoryBIOSocket(_green_socket_.socket):
+    """A TLS socket that encrypts and decrypts data in memory.
+
+    This class is an alternative to :class:`SSLSocket`. The TLS protocol runs
+    on an ``SSLObject`` attached to two ``MemoryBIO`` buffers, and the
+    encrypted data is transferred with the green socket methods. Reads from
+    the socket are done in large blocks, so that several TLS records can be
+    received with a single system call, and all the records produced by an
+    operation are sent together. To use this class, assign it to the
+    ``sslsocket_class`` attribute of a context::
+
+        context = ssl.create_default_context()
+        context.sslsocket_class = ssl.MemoryBIOSocket
+    """
+    _sslobj = None
+
+    @classmethod
+    def _create(cls, sock, server_side=False, do_handshake_on_connect=True,
+                suppress_ragged_eofs=True, server_hostname=None,
+                context=None, session=None):
+        if sock.getsockopt(SOL_SOCKET, SO_TYPE) != SOCK_STREAM:
+            raise NotImplementedError('only stream sockets are supported')
+        if server_side and server_hostname:
+            raise ValueError('server_hostname can only be specified in '
+                             'client mode')
+        if context.check_hostname and not server_hostname:
+            raise ValueError('check_hostname requires server_hostname')
+        sock_timeout = sock.gettimeout()
+        self = cls(sock.family, sock.type, sock.proto, fileno=sock.detach())
+        self.settimeout(sock_timeout)
+        self._context = context
+        self._session = session
+        self.server_side = server_side
+        self.server_hostname = server_hostname
+        self.do_handshake_on_connect = do_handshake_on_connect
+        self.suppress_ragged_eofs = suppress_ragged_eofs
+        self._incoming = MemoryBIO()
+        self._outgoing = MemoryBIO()
+        try:
+            address = self.getpeername()
+        except OSError as exc:
+            if exc.errno != errno.ENOTCONN:  # pragma: no cover
+                raise
+            self._connected = False
+        else:
+            self._connected = True
+            try:
+                self._wrap(address)
+            except (OSError, ValueError):  # pragma: no cover
+                self.close()
+                raise
+        return self
+
+    def _wrap(self, address):
+        if self._session is None:
+            self._session_port, self._session = _cached_session(
+                self._context, self.server_side, self.server_hostname,
+                self.family, address)
+        self._sslobj = self._context.wrap_bio(
+            self._incoming, self._outgoing, server_side=self.server_side,
+            server_hostname=self.server_hostname, session=self._session)
+        if self.do_handshake_on_connect:
+            self.do_handshake()
+
+    def _flush(self):
+        # send the encrypted data produced by the last operation in one go
+        if self._outgoing.pending:
+            super().sendall(self._outgoing.read())
+
+    def _run(self, method, *args):
+        while True:
+            try:
+                ret = method(*args)
+            except SSLWantReadError:
+                self._flush()
+                data = super().recv(_READ_AHEAD_SIZE)
+                if data:
+                    self._incoming.write(data)
+                else:
+                    self._incoming.write_eof()
+            else:
+                self._flush()
+                return ret
+
+    @property
+    def context(self):
+        return self._context
+
+    @property
+    def session(self):
+        if self._sslobj is not None:
+            return self._sslobj.session
+
+    @property
+    def session_reused(self):
+        if self._sslobj is not None:
+            return self._sslobj.session_reused
+
+    def do_handshake(self):
+        self._run(self._sslobj.do_handshake)
+        self._handshake_done()
+
+    _session_port = None
+    _handshake_done = SSLSocket._handshake_done
+    _save_session = SSLSocket._save_session
+
+    def _real_close(self, *args, **kwargs):
+        self._save_session()
+        self._sslobj = None
+        super()._real_close(*args, **kwargs)
+
+    def connect(self, address):
+        if self.server_side:  # pragma: no cover
+            raise ValueError("can't connect in server-side mode")
+        if self._connected:  # pragma: no cover
+            raise ValueError('attempt to connect already-connected socket')
+        super().connect(address)
+        self._connected = True
+        self._wrap(address)
+
+    def connect_ex(self, address):  # pragma: no cover
+        try:
+            self.connect(address)
+        except OSError as exc:
+            return exc.errno
+        return 0
+
+    def _accepted(self, fd):
+        # wrap the connections returned by both accept() and accept_many()
+        sock = super()._accepted(fd)
+        try:
+            return self._context.wrap_socket(
+                sock, server_side=self.server_side,
+                do_handshake_on_connect=self.do_handshake_on_connect,
+                suppress_ragged_eofs=self.suppress_ragged_eofs)
+        except BaseException:
+            sock.close()
+            raise
+
+    def _decrypt(self, size, buffer=None):
+        if self._sslobj is None:  # pragma: no cover
+            raise ValueError('Read on closed or unwrapped SSL socket.')
+        try:
+            if buffer is not None:
+                return self._run(self._sslobj.read, size, buffer)
+            return self._run(self._sslobj.read, size)
+        except SSLZeroReturnError:
+            pass
+        except SSLEOFError:
+            if not self.suppress_ragged_eofs:  # pragma: no cover
+                raise
+        return 0 if buffer is not None else b''
+
+    # small reads are served from a buffer of decrypted data, as in green
+    # SSL sockets
+    _read_buffer = None
+    _buffered_read = SSLSocket._buffered_read
+
+    def read(self, len=1024, buffer=None):
+        return self._buffered_read(len, buffer)
+
+    def write(self, data):
+        if self._sslobj is None:  # pragma: no cover
+            raise ValueError('Write on closed or unwrapped SSL socket.')
+        return self._run(self._sslobj.write, data)
+
+    def recv(self, buflen=1024, flags=0):
+        if self._sslobj is None:  # pragma: no cover
+            return super().recv(buflen, flags)
+        if flags != 0:  # pragma: no cover
+            raise ValueError('non-zero flags not allowed in calls to recv()')
+        return self.read(buflen)
+
+    def recv_into(self, buffer, nbytes=None, flags=0):
+        if self._sslobj is None:  # pragma: no cover
+            return super().recv_into(buffer, nbytes, flags)
+        if flags != 0:  # pragma: no cover
+            raise ValueError(
+                'non-zero flags not allowed in calls to recv_into()')
+        if not nbytes:
+            nbytes = len(buffer)
+        return self.read(nbytes, buffer)
+
+    def send(self, data, flags=0):
+        if self._sslobj is None:  # pragma: no cover
+            return super().send(data, flags)
+        if flags != 0:  # pragma: no cover
+            raise ValueError('non-zero flags not allowed in calls to send()')
+        return self.write(data)
+
+    def sendall(self, data, flags=0):
+        if self._sslobj is None:  # pragma: no cover
+            return super().sendall(data, flags)
+        if flags != 0:  # pragma: no cover
+            raise ValueError(
+                'non-zero flags not allowed in calls to sendall()')
+        # the memory BIO accepts all the encrypted data, so a write is never
+        # partial
+        self.write(data)
+
+    def sendall_vectored(self, buffers, flags=0):
+        if self._sslobj is None:  # pragma: no cover
+            return super().sendall_vectored(buffers, flags)
+        if flags != 0:  # pragma: no cover
+            raise ValueError(
+                'non-zero flags not allowed in calls to sendall_vectored()')
+        # encrypt all the buffers before sending the result with a single
+        # system call
+        for buffer in buffers:
+            self._sslobj.write(buffer)
+        self._flush()
+
+    def _sendfile_use_sendfile(self, file, offset=0, count=None):
+        if self._sslobj is not None:
+            raise _GiveupOnSendfile('the data needs to be encrypted')
+        return super()._sendfile_use_sendfile(
+            file, offset, count)  # pragma: no cover
+
+    def pending(self):
+        # the encrypted data waiting in the incoming buffer is included,
+        # since it cannot be detected by waiting on the socket
+        if self._sslobj is None:  # pragma: no cover
+            return 0
+        buffered = self._incoming.pending
+        if self._read_buffer is not None:
+            with self._read_buffer.getbuffer() as view:
+                buffered += view.nbytes - self._read_buffer.tell()
+        return buffered + self._sslobj.pending()
+
+    def unwrap(self):
+        if self._sslobj is None:  # pragma: no cover
+            raise ValueError('No SSL wrapper around ' + str(self))
+        self._run(self._sslobj.unwrap)
+        self._sslobj = None
+        return self
+
+    def shutdown(self, how):
+        self._sslobj = None
+        super().shutdown(how)
+
+    def dup(self):  # pragma: no cover
+        raise NotImplementedError("Can't dup() %s instances" %
+                                  self.__class__.__name__)
+
+    def getpeercert(self, binary_form=False):
+        if self._sslobj is None:  # pragma: no cover
+            raise ValueError('no SSL connection')
+        return self._sslobj.getpeercert(binary_form)
+
+    def cipher(self):
+        if self._sslobj is not None:
+            return self._sslobj.cipher()
+
+    def shared_ciphers(self):  # pragma: no cover
+        if self._sslobj is not None:
+            return self._sslobj.shared_ciphers()
+
+    def compression(self):  # pragma: no cover
+        if self._sslobj is not None:
+            return self._sslobj.compression()
+
+    def version(self):
+        if self._sslobj is not None:
+            return self._sslobj.version()
+
+    def selected_alpn_protocol(self):  # pragma: no cover
+        if self._sslobj is not None:
+            return self._sslobj.selected_alpn_protocol()
+
+    def get_channel_binding(self, cb_type='tls-unique'):  # pragma: no cover
+        if self._sslobj is not None:
+            return self._sslobj.get_channel_binding(cb_type)
+
+    def verify_client_post_handshake(self):  # pragma: no cover
+        if self._sslobj is None:
+            raise ValueError('No SSL wrapper around ' + str(self))
+        self._run(self._sslobj.verify_client_post_handshake)
+
+    def _not_allowed(self, *args, **kwargs):
+        # these methods would transfer data without encrypting it
+        raise NotImplementedError('method not allowed on instances of %s' %
+                                  self.__class__.__name__)
 
-    def sendfile(self, *args, **kwargs):  # pragma: no cover
-        raise RuntimeError('socket.sendfile is not supported')
+    recvfrom = recvfrom_into = recvmsg = recvmsg_into = sendto = sendmsg = \
+        _not_allowed
 
 
 SSLContext.sslsocket_class = SSLSocket
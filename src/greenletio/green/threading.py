@@ -2,7 +2,7 @@ import asyncio
 import collections
 import weakref
 import greenlet
-from greenletio.core import await_, async_
+from greenletio.core import await_, _run_greenlet, _wait_tasks
 from greenletio.patcher import copy_globals
 import threading as _original_threading_
 
@@ -17,20 +17,78 @@ def get_ident():
 
 class Lock:
     def __init__(self):
-        self._lock = asyncio.Lock()
-        self.locked = self._lock.locked
-        self.release = self._lock.release
+        self._locked = False
+        self._waiters = collections.deque()
+
+    def locked(self):
+        return self._locked
 
     def acquire(self, blocking=True, timeout=None):
-        if not blocking and self.locked():
+        if not self._locked:
+            # the lock is free, so there is no need to involve the loop
+            self._locked = True
+            return True
+        if not blocking:
             return False
-        if timeout is None or timeout < 0:
-            return await_(self._lock.acquire())
-        else:
+
+        loop = asyncio.get_event_loop()
+        deadline = None
+        if timeout is not None and timeout >= 0:
+            deadline = loop.time() + timeout
+        fut = loop.create_future()
+        self._waiters.append(fut)
+        while True:
+            timer = None
+            if deadline is not None:
+                timer = loop.call_at(deadline, self._timeout, fut)
             try:
-                return await_(asyncio.wait_for(self._lock.acquire(), timeout))
-            except asyncio.TimeoutError:
+                woken = await_(fut)
+            except asyncio.CancelledError:  # pragma: no cover
+                if fut.done() and not fut.cancelled() and not self._locked:
+                    # pass the wake up to the next waiter
+                    self._wake_next()
+                raise
+            finally:
+                if timer is not None:
+                    timer.cancel()
+            if not woken:
                 return False
+            if not self._locked:
+                self._locked = True
+                return True
+            # another greenlet took the lock before this one was able to run,
+            # so wait again from the front of the queue
+            fut = loop.create_future()
+            self._waiters.appendleft(fut)
+
+    def release(self):
+        if not self._locked:
+            raise RuntimeError('Lock is not acquired.')
+        self._locked = False
+        self._wake_next()
+
+    def _wake_next(self):
+        while self._waiters:
+            fut = self._waiters.popleft()
+            if not fut.done():
+                fut.set_result(True)
+                break
+
+    def _timeout(self, fut):
+        if not fut.done():
+            self._waiters.remove(fut)
+            fut.set_result(False)
+
+    def _transfer(self, fut):
+        # waiters transferred from a condition are woken up along with those
+        # waiting to acquire the lock, one at a time as the lock is released
+        self._waiters.append(fut)
+
+    def _release_save(self):
+        self.release()
+
+    def _acquire_restore(self, state):
+        self.acquire()
 
     def __enter__(self):
         return self.acquire()
@@ -79,6 +137,20 @@ class RLock:
             self.owner = None
             self._lock.release()
 
+    def _transfer(self, fut):
+        self._lock._transfer(fut)
+
+    def _release_save(self):
+        state = (self.owner, self.count)
+        self.owner = None
+        self.count = 0
+        self._lock.release()
+        return state
+
+    def _acquire_restore(self, state):
+        self._lock.acquire()
+        self.owner, self.count = state
+
     def __enter__(self):
         return self.acquire()
 
@@ -94,6 +166,20 @@ class Condition:
         self.locked = lock.locked
         self.acquire = lock.acquire
         self.release = lock.release
+        # the green locks support handing notified waiters over to their own
+        # wait queue, other locks use the fallbacks defined below
+        try:
+            self._release_save = lock._release_save
+        except AttributeError:
+            pass
+        try:
+            self._acquire_restore = lock._acquire_restore
+        except AttributeError:
+            pass
+        try:
+            self._transfer = lock._transfer
+        except AttributeError:
+            pass
         self._waiters = collections.deque()
 
     def __repr__(self):  # pragma: no cover
@@ -103,35 +189,55 @@ class Condition:
             extra = f'{extra}, waiters:{len(self._waiters)}'
         return f'<{res[1:-1]} [{extra}]>'
 
+    def _release_save(self):
+        self._lock.release()
+
+    def _acquire_restore(self, state):
+        self._lock.acquire()
+
+    def _transfer(self, fut):
+        # a lock without a wait queue of its own cannot wake up notified
+        # waiters as it is released, so they are woken up right away and
+        # compete for the lock
+        fut.set_result(True)
+
     def wait(self, timeout=None):
         if not self.locked():
             raise RuntimeError('cannot wait on un-acquired lock')
 
-        self.release()
+        loop = asyncio.get_event_loop()
+        fut = loop.create_future()
+        self._waiters.append(fut)
+        state = self._release_save()
+        timer = None
+        if timeout is not None:
+            timer = loop.call_later(timeout, self._timeout, fut)
+        cancelled = False
         try:
-            fut = asyncio.get_event_loop().create_future()
-            self._waiters.append(fut)
+            await_(fut)
+        except asyncio.CancelledError:  # pragma: no cover
+            cancelled = True
+        if timer is not None:
+            timer.cancel()
+
+        if fut.cancelled() and fut in self._waiters:  # pragma: no cover
+            self._waiters.remove(fut)
+        while True:
             try:
-                if timeout is None:
-                    await_(fut)
-                else:
-                    try:
-                        await_(asyncio.wait_for(fut, timeout))
-                    except asyncio.TimeoutError:
-                        return False
-                return True
-            finally:
-                self._waiters.remove(fut)
-        finally:
-            cancelled = False
-            while True:
-                try:
-                    self.acquire()
-                    break
-                except asyncio.CancelledError:  # pragma: no cover
-                    cancelled = True
-            if cancelled:  # pragma: no cover
-                raise asyncio.CancelledError
+                self._acquire_restore(state)
+                break
+            except asyncio.CancelledError:  # pragma: no cover
+                cancelled = True
+        if cancelled:  # pragma: no cover
+            raise asyncio.CancelledError
+        return fut.result()
+
+    def _timeout(self, fut):
+        # waiters that were already notified are waiting for the lock, so
+        # they are not affected by the timeout
+        if fut in self._waiters:
+            self._waiters.remove(fut)
+            fut.set_result(False)
 
     def wait_for(self, predicate, timeout=None):
         result = predicate()
@@ -144,14 +250,13 @@ class Condition:
         if not self.locked():
             raise RuntimeError('cannot notify on un-acquired lock')
 
-        idx = 0
-        for fut in self._waiters:
-            if idx >= n:  # pragma: no cover
-                break
-
-            if not fut.done():  # pragma: no cover
-                idx += 1
-                fut.set_result(False)
+        # notified waiters are moved to the lock, which wakes them up one at
+        # a time as it is released
+        while n > 0 and self._waiters:
+            fut = self._waiters.popleft()
+            if not fut.done():  # pragma: no branch
+                self._transfer(fut)
+                n -= 1
 
     def notify_all(self):
         self.notify(len(self._waiters))
@@ -194,6 +299,8 @@ class BoundedSemaphore(Semaphore):
 
 class Event(asyncio.Event):
     def wait(self, timeout=None):
+        if self.is_set():
+            return True
         if timeout is None:
             return await_(super().wait())
         else:
@@ -215,23 +322,70 @@ class Barrier(_original_threading_.Barrier):
         self._count = 0
 
 
+class _Flag:
+    # the standard thread methods only check if a thread was started, so a
+    # constant is used instead of an event
+    __slots__ = ('_value',)
+
+    def __init__(self, value):
+        self._value = value
+
+    def is_set(self):
+        return self._value
+
+
+_STARTED = _Flag(True)
+_NOT_STARTED = _Flag(False)
+
+
 class Thread(_original_threading_.Thread):
+    # the attributes that have the same initial value in all threads are
+    # defined in the class, and the name is only created if it is needed
+    _daemonic = False
+    _ident = None
+    _is_stopped = False
+    _initialized = True
+    _task = None
+    _name_template = 'GThread-%d'
+
     def __init__(self, group=None, target=None, name=None, args=(),
                  kwargs=None, *, daemon=None):
         assert group is None, "group argument must be None for now"
         if kwargs is None:
             kwargs = {}
         self._target = target
-        self._name = str(name or _original_threading_._newname('GThread-%d'))
+        self._name = str(name) if name else None
         self._args = args
         self._kwargs = kwargs
-        self._daemonic = False
-        self._ident = None
-        self._started = Event()
-        self._ended = Event()
-        self._is_stopped = False
-        self._initialized = True
-        self._task = None
+
+    @property
+    def _started(self):
+        # the thread is started when it has a task
+        return _NOT_STARTED if self._task is None else _STARTED
+
+    @property
+    def name(self):
+        if self._name is None:
+            self._name = _original_threading_._newname(self._name_template)
+        return self._name
+
+    @name.setter
+    def name(self, name):
+        self._name = str(name)
+
+    def __repr__(self):
+        # the standard method depends on the internal state of system
+        # threads, which changes between Python versions
+        status = 'initial'
+        if self._started.is_set():
+            status = 'started'
+        if self._is_stopped:
+            status = 'stopped'
+        if self._daemonic:
+            status += ' daemon'
+        if self._ident is not None:
+            status += ' %s' % self._ident
+        return '<%s(%s, %s)>' % (self.__class__.__name__, self.name, status)
 
     def start(self):
         if not self._initialized:  # pragma: no cover
@@ -240,15 +394,12 @@ class Thread(_original_threading_.Thread):
         if self._started.is_set():
             raise RuntimeError("threads can only be started once")
 
-        async def bootstrap():
-            await async_(self._bootstrap)()
-
         try:
-            self.task = asyncio.ensure_future(bootstrap())
+            loop = asyncio.get_event_loop()
         except RuntimeError:  # pragma: no cover
-            asyncio.set_event_loop(asyncio.new_event_loop())
-            self.task = asyncio.ensure_future(bootstrap())
-        self._started.set()
+            loop = asyncio.new_event_loop()
+            asyncio.set_event_loop(loop)
+        self._task = loop.create_task(_run_greenlet(self._bootstrap, (), {}))
 
     def _set_ident(self):
         self._ident = get_ident()
@@ -256,12 +407,14 @@ class Thread(_original_threading_.Thread):
     def _bootstrap(self):
         self._set_ident()
         _active[self._ident] = self
+        cur = greenlet.getcurrent()
+        cur._greenletio_thread = self
         try:
             self.run()
         finally:
             self._is_stopped = True
             del _active[self._ident]
-            self._ended.set()
+            del cur._greenletio_thread
 
     def join(self, timeout=None):
         if not self._initialized:  # pragma: no cover
@@ -271,7 +424,8 @@ class Thread(_original_threading_.Thread):
         if self is current_thread():
             raise RuntimeError("cannot join current thread")
 
-        self._ended.wait()
+        if not self._is_stopped:
+            _wait_tasks([self._task], timeout)
 
     def is_alive(self):
         assert self._initialized, "Thread.__init__() not called"
@@ -279,12 +433,17 @@ class Thread(_original_threading_.Thread):
 
 
 class _DummyThread(Thread):
+    # dummy threads are created often, so they only store their identity
+    _name_template = 'Dummy-%d'
+    _daemonic = True
+    _started = _STARTED
+    _target = None
+    _name = None
+    _args = ()
+    _kwargs = None
 
     def __init__(self):
-        Thread.__init__(self, name=_original_threading_._newname("Dummy-%d"),
-                        daemon=True)
-        self._set_ident()
-        _active[self._ident] = self
+        self._ident = get_ident()
 
     def _stop(self):  # pragma: no cover
         pass
@@ -297,11 +456,40 @@ class _DummyThread(Thread):
         assert False, "cannot join a dummy thread"
 
 
+def join_all(threads, timeout=None):
+    """Wait for several threads to end.
+
+    This is equivalent to calling ``join()`` on each thread, but the caller
+    is woken up only once, when the last thread ends or the timeout expires.
+
+    :param threads: the threads to wait for.
+    :param timeout: the maximum number of seconds to wait, or ``None`` to
+                    wait until all the threads end.
+
+    The return value is ``True`` if all the threads ended, or ``False`` if
+    the timeout expired first.
+    """
+    threads = list(threads)
+    current = current_thread()
+    for thread in threads:
+        if not thread._started.is_set():
+            raise RuntimeError("cannot join thread before it is started")
+        if thread is current:
+            raise RuntimeError("cannot join current thread")
+    _wait_tasks([thread._task for thread in threads
+                 if not thread._is_stopped], timeout)
+    return all(thread._is_stopped for thread in threads)
+
+
 def current_thread():
-    try:
-        return _active[get_ident()]
-    except KeyError:
-        return _DummyThread()
+    # the thread object is stored in its greenlet, so that greenlets that are
+    # not green threads get a single dummy thread object, which is released
+    # along with the greenlet
+    cur = greenlet.getcurrent()
+    thread = getattr(cur, '_greenletio_thread', None)
+    if thread is None:
+        thread = cur._greenletio_thread = _DummyThread()
+    return thread
 
 
 class Timer(Thread):
@@ -324,40 +512,91 @@ class Timer(Thread):
         self.finished.set()
 
 
+def _no_owner():
+    return None
+
+
 class _localbase(object):
-    __slots__ = '_local__args', '_local__greens'
+    __slots__ = '_local__args', '_local__greens', '_local__owner'
 
     def __new__(cls, *args, **kw):
         self = object.__new__(cls)
         object.__setattr__(self, '_local__args', (args, kw))
         object.__setattr__(self, '_local__greens', weakref.WeakKeyDictionary())
+        object.__setattr__(self, '_local__owner', _no_owner)
         if (args or kw) and \
                 (cls.__init__ is object.__init__):  # pragma: no cover
             raise TypeError("Initialization arguments are not supported")
         return self
 
 
-def _patch(thrl):
-    greens = object.__getattribute__(thrl, '_local__greens')
-    cur = greenlet.getcurrent()
-    if cur not in greens:
-        greens[cur] = {}
+_getattribute = object.__getattribute__
+_setattr = object.__setattr__
+_delattr = object.__delattr__
+_getcurrent = greenlet.getcurrent
+
+
+class _GreenletLocals:
+    # the locals that have data for a greenlet. An instance is stored in the
+    # greenlet, and releases that data when the attributes of the greenlet
+    # are cleared, which happens when a GreenletPool reuses it, so that the
+    # next function that runs in it does not see the data.
+    __slots__ = ('greenlet', 'locals')
+
+    def __init__(self, cur):
+        self.greenlet = weakref.ref(cur)
+        self.locals = []
+
+    def __del__(self):
+        cur = self.greenlet()
+        if cur is None:
+            # the greenlet is gone, and so are its keys in the locals
+            return
+        for ref in self.locals:
+            thrl = ref()
+            if thrl is not None:
+                _getattribute(thrl, '_local__greens').pop(cur, None)
+                if _getattribute(thrl, '_local__owner')() is cur:
+                    _setattr(thrl, '_local__owner', _no_owner)
+                    _setattr(thrl, '__dict__', {})
+
+
+def _patch(thrl, cur):
+    # install the dictionary of the current greenlet, which remains in place
+    # until the local is used from a different greenlet
+    greens = _getattribute(thrl, '_local__greens')
+    d = greens.get(cur)
+    _setattr(thrl, '_local__owner', weakref.ref(cur))
+    if d is None:
+        d = greens[cur] = {}
+        _setattr(thrl, '__dict__', d)
+        owned = getattr(cur, '_greenletio_locals', None)
+        if owned is None:
+            owned = cur._greenletio_locals = _GreenletLocals(cur)
+        owned.locals.append(weakref.ref(thrl))
         cls = type(thrl)
         if cls.__init__ is not object.__init__:
-            args, kw = object.__getattribute__(thrl, '_local__args')
+            args, kw = _getattribute(thrl, '_local__args')
             thrl.__init__(*args, **kw)
-    object.__setattr__(thrl, '__dict__', greens[cur])
+    else:
+        _setattr(thrl, '__dict__', d)
 
 
 class local(_localbase):
     def __getattribute__(self, attr):
-        _patch(self)
-        return object.__getattribute__(self, attr)
+        cur = _getcurrent()
+        if _getattribute(self, '_local__owner')() is not cur:
+            _patch(self, cur)
+        return _getattribute(self, attr)
 
     def __setattr__(self, attr, value):
-        _patch(self)
-        return object.__setattr__(self, attr, value)
+        cur = _getcurrent()
+        if _getattribute(self, '_local__owner')() is not cur:
+            _patch(self, cur)
+        return _setattr(self, attr, value)
 
     def __delattr__(self, attr):
-        _patch(self)
-        return object.__delattr__(self, attr)
+        cur = _getcurrent()
+        if _getattribute(self, '_local__owner')() is not cur:
+            _patch(self, cur)
+        return _delattr(self, attr)
@@ -1,10 +1,59 @@
 import asyncio
-from greenletio.core import await_
+import math
+import weakref
+from greenletio.core import await_, _switch_to_loop, _wake, _yield
 from greenletio.patcher import copy_globals
 import time as _original_time_
 
 copy_globals(_original_time_, globals())
 
+# sleeps that end within the same slot of this many seconds share a timer
+_TIMER_RESOLUTION = 0.001
 
-def sleep(seconds):  # pragma: no cover
-    await_(asyncio.sleep(seconds))
+
+class _TimerWheel:
+    """Sleeping greenlets, grouped by the time slot in which they wake up.
+
+    Only one loop timer is scheduled for each slot, regardless of how many
+    greenlets are sleeping in it, so the loop's timer heap stays small when
+    large numbers of greenlets sleep for short intervals.
+    """
+    def __init__(self, loop):
+        self.loop = loop
+        self.slots = {}
+
+    def _expire(self, slot):
+        for fut in self.slots.pop(slot):
+            _wake(fut)
+
+    def sleep(self, seconds):
+        # round the wake up time up, so that a sleep never ends early
+        slot = math.ceil((self.loop.time() + seconds) / _TIMER_RESOLUTION)
+        futs = self.slots.get(slot)
+        if futs is None:
+            futs = self.slots[slot] = []
+            self.loop.call_at(slot * _TIMER_RESOLUTION, self._expire, slot)
+        fut = self.loop.create_future()
+        futs.append(fut)
+        await_(fut)
+
+
+_wheels = weakref.WeakKeyDictionary()
+
+
+def sleep(seconds):
+    if seconds < 0:
+        raise ValueError('sleep length must be non-negative')
+    if seconds == 0:
+        _switch_to_loop(_yield)
+        return
+    try:
+        loop = asyncio.get_running_loop()
+    except RuntimeError:
+        # the loop is not running yet, so the bridge has to start it
+        await_(asyncio.sleep(seconds))
+        return
+    wheel = _wheels.get(loop)
+    if wheel is None:
+        wheel = _wheels[loop] = _TimerWheel(loop)
+    wheel.sleep(seconds)
@@ -1,46 +1,388 @@
 import asyncio
-from greenletio.core import await_
+import functools
+import weakref
+from greenletio.core import await_, _wake
 
 
-def wait_to_read(fd):
-    event = asyncio.Event()
-    asyncio.get_event_loop().add_reader(fd, event.set)
-    await_(event.wait())
-    asyncio.get_event_loop().remove_reader(fd)
+class _FdEntry:
+    # The loop registrations of a file descriptor, shared by everything in
+    # greenletio that waits on it. The loop only allows one reader and one
+    # writer callback per file descriptor, so each waiter adds its own
+    # callback here instead, and the entry dispatches to all of them. A
+    # callback returns False when its owner is not waiting anymore, and is
+    # then removed. The file descriptor is removed from the loop when it has
+    # no callbacks left. When the file descriptor is closed, the callbacks
+    # are invoked with registered=False, to let their owners know that they
+    # are not registered anymore.
+    __slots__ = ('loop', 'fds', 'fd', 'readers', 'writers')
 
+    def __init__(self, loop, fds, fd):
+        # the registry holds the loop weakly, so the entries must not keep it
+        # alive
+        self.loop = weakref.proxy(loop)
+        self.fds = fds
+        self.fd = fd
+        self.readers = {}
+        self.writers = {}
 
-def wait_to_write(fd):
-    event = asyncio.Event()
-    asyncio.get_event_loop().add_writer(fd, event.set)
-    await_(event.wait())
-    asyncio.get_event_loop().remove_writer(fd)
+    def _dispatch(self, callbacks):
+        for callback in list(callbacks):
+            if not callback():
+                callbacks.pop(callback, None)
+
+    def _on_readable(self):
+        self._dispatch(self.readers)
+        if not self.readers:
+            self.loop.remove_reader(self.fd)
+            self._release()
+
+    def _on_writable(self):
+        self._dispatch(self.writers)
+        if not self.writers:
+            self.loop.remove_writer(self.fd)
+            self._release()
+
+    def _release(self):
+        if not self.readers and not self.writers and \
+                self.fds.get(self.fd) is self:
+            del self.fds[self.fd]
+
+    def close(self):
+        if self.fds.get(self.fd) is self:
+            del self.fds[self.fd]
+        readers, self.readers = self.readers, {}
+        writers, self.writers = self.writers, {}
+        if readers:
+            self.loop.remove_reader(self.fd)
+        if writers:
+            self.loop.remove_writer(self.fd)
+        for callback in list(readers) + list(writers):
+            callback(registered=False)
+
+    def add(self, callback, writing=False):
+        if writing:
+            if not self.writers:
+                self.loop.add_writer(self.fd, self._on_writable)
+            self.writers[callback] = None
+        else:
+            if not self.readers:
+                self.loop.add_reader(self.fd, self._on_readable)
+            self.readers[callback] = None
+
+    def remove(self, callback, writing=False):
+        callbacks = self.writers if writing else self.readers
+        if callback not in callbacks:
+            return
+        del callbacks[callback]
+        if not callbacks:
+            if writing:
+                self.loop.remove_writer(self.fd)
+            else:
+                self.loop.remove_reader(self.fd)
+            self._release()
+
+
+_registry = weakref.WeakKeyDictionary()
+
+
+def _fileno(fileobj):
+    if isinstance(fileobj, int):
+        return fileobj
+    return int(fileobj.fileno())
+
+
+def _watch(loop, fd, callback, writing=False):
+    fds = _registry.get(loop)
+    if fds is None:
+        fds = _registry[loop] = {}
+    entry = fds.get(fd)
+    if entry is None:
+        entry = fds[fd] = _FdEntry(loop, fds, fd)
+    entry.add(callback, writing)
+
+
+def _unwatch(loop, fd, callback, writing=False):
+    entry = _registry.get(loop, {}).get(fd)
+    if entry is not None:
+        entry.remove(callback, writing)
+
+
+def _forget(fd):
+    # remove all the registrations of a file descriptor that is being closed,
+    # so that a new file descriptor that reuses its number starts clean
+    for fds in list(_registry.values()):
+        entry = fds.get(fd)
+        if entry is not None:
+            entry.close()
+
+
+def _waiter(fut):
+    # a callback for a single wait, which stays registered until the wait ends
+    def callback(registered=True):
+        _wake(fut, True)
+        return True
+
+    return callback
+
+
+class FdWatcher:
+    """Persistent selector registration for a file descriptor.
+
+    The reader and writer callbacks are left registered with the loop after a
+    wait completes, so that a greenlet that waits on the same file descriptor
+    repeatedly does not need to add it to and remove it from the selector each
+    time. A callback that fires while no greenlet is waiting unregisters
+    itself, so that an idle file descriptor that is ready does not keep the
+    loop busy.
+
+    The loop registrations are shared with anything else in greenletio that
+    waits on the same file descriptor, such as the green ``select`` functions
+    and selectors, so those can be used on it in between waits.
+
+    :param fd: the file descriptor to watch.
+    :param owner: an optional object that owns the file descriptor. When
+                  given, the registrations are removed when this object is
+                  garbage collected.
+    """
+    def __init__(self, fd, owner=None):
+        self.fd = fd
+        self.loop = None
+        self.reading = False
+        self.writing = False
+        self.reader = None
+        self.writer = None
+        if owner is not None:
+            weakref.finalize(owner, self.close)
+
+    def _get_loop(self):
+        loop = asyncio.get_event_loop()
+        if loop is not self.loop:
+            # the registrations made on a previous loop are not valid anymore
+            self.close()
+            self.loop = loop
+        return loop
+
+    def _on_readable(self, registered=True):
+        if self.reader is not None:
+            _wake(self.reader, True)
+            if registered:
+                return True
+        self.reading = False
+        return False
+
+    def _on_writable(self, registered=True):
+        if self.writer is not None:
+            _wake(self.writer, True)
+            if registered:
+                return True
+        self.writing = False
+        return False
+
+    def wait_to_read(self, timeout=None):
+        """Wait until the file descriptor is readable.
+
+        :param timeout: the maximum number of seconds to wait, or ``None`` to
+                        wait indefinitely.
+
+        The return value is ``False`` if the timeout expired, or ``True``
+        otherwise.
+        """
+        loop = self._get_loop()
+        if not self.reading:
+            _watch(loop, self.fd, self._on_readable)
+            self.reading = True
+        self.reader = loop.create_future()
+        timer = None
+        if timeout is not None:
+            timer = loop.call_later(timeout, _wake, self.reader, False)
+        try:
+            return await_(self.reader)
+        finally:
+            self.reader = None
+            if timer is not None:
+                timer.cancel()
+
+    def wait_to_write(self, timeout=None):
+        """Wait until the file descriptor is writable.
+
+        :param timeout: the maximum number of seconds to wait, or ``None`` to
+                        wait indefinitely.
+
+        The return value is ``False`` if the timeout expired, or ``True``
+        otherwise.
+        """
+        loop = self._get_loop()
+        if not self.writing:
+            _watch(loop, self.fd, self._on_writable, writing=True)
+            self.writing = True
+        self.writer = loop.create_future()
+        timer = None
+        if timeout is not None:
+            timer = loop.call_later(timeout, _wake, self.writer, False)
+        try:
+            return await_(self.writer)
+        finally:
+            self.writer = None
+            if timer is not None:
+                timer.cancel()
+
+    def close(self):
+        """Remove the selector registrations for the file descriptor. This
+        method must be called before the file descriptor is closed."""
+        if self.reading:
+            _unwatch(self.loop, self.fd, self._on_readable)
+            self.reading = False
+        if self.writing:
+            _unwatch(self.loop, self.fd, self._on_writable, writing=True)
+            self.writing = False
+        # wake up any greenlets that are still waiting, so that they can find
+        # out that the file descriptor is gone
+        if self.reader is not None:
+            _wake(self.reader, True)
+        if self.writer is not None:
+            _wake(self.writer, True)
+
+
+def wait_to_read(fd, timeout=None):
+    loop = asyncio.get_event_loop()
+    fut = loop.create_future()
+    fd = _fileno(fd)
+    callback = _waiter(fut)
+    _watch(loop, fd, callback)
+    timer = None
+    if timeout is not None:
+        timer = loop.call_later(timeout, _wake, fut, False)
+    try:
+        return await_(fut)
+    finally:
+        _unwatch(loop, fd, callback)
+        if timer is not None:
+            timer.cancel()
+
+
+def wait_to_write(fd, timeout=None):
+    loop = asyncio.get_event_loop()
+    fut = loop.create_future()
+    fd = _fileno(fd)
+    callback = _waiter(fut)
+    _watch(loop, fd, callback, writing=True)
+    timer = None
+    if timeout is not None:
+        timer = loop.call_later(timeout, _wake, fut, False)
+    try:
+        return await_(fut)
+    finally:
+        _unwatch(loop, fd, callback, writing=True)
+        if timer is not None:
+            timer.cancel()
+
+
+class SelectorState:
+    """Selector registrations for a set of file descriptors that persist
+    across waits.
+
+    Each call to :meth:`wait` compares the requested file descriptors against
+    those that are currently registered with the loop, and only adds or
+    removes the differences. This makes repeated waits on the same set of
+    file descriptors, as done by selector objects, independent of the size of
+    the set. As with :class:`FdWatcher`, a callback that fires while nobody is
+    waiting unregisters itself.
+
+    The registrations are shared with the other waiters on the same file
+    descriptors, so a green socket that waits on one of them in between two
+    calls does not take it away from the selector.
+    """
+    def __init__(self):
+        self.loop = None
+        self.readers = {}
+        self.writers = {}
+        self.ready_readers = {}
+        self.ready_writers = {}
+        self.fut = None
+
+    def _on_readable(self, fd, registered=True):
+        if self.fut is not None:
+            self.ready_readers[fd] = None
+            _wake(self.fut)
+            if registered:
+                return True
+        self.readers.pop(fd, None)
+        return False
+
+    def _on_writable(self, fd, registered=True):
+        if self.fut is not None:
+            self.ready_writers[fd] = None
+            _wake(self.fut)
+            if registered:
+                return True
+        self.writers.pop(fd, None)
+        return False
+
+    def wait(self, read_list, write_list, timeout=None):
+        """Wait until any of the given file descriptors are ready.
+
+        :param read_list: the file descriptors to wait on for reading.
+        :param write_list: the file descriptors to wait on for writing.
+        :param timeout: the maximum number of seconds to wait, or ``None`` to
+                        wait until a file descriptor is ready.
+
+        The return value is a tuple with the lists of file descriptors that
+        are ready for reading and for writing.
+        """
+        loop = asyncio.get_event_loop()
+        if loop is not self.loop:
+            self.close()
+            self.loop = loop
+        read_set = set(read_list)
+        for fd in self.readers.keys() - read_set:
+            _unwatch(loop, *self.readers.pop(fd))
+        for fd in read_set - self.readers.keys():
+            self.readers[fd] = (_fileno(fd),
+                                functools.partial(self._on_readable, fd))
+            _watch(loop, *self.readers[fd])
+        write_set = set(write_list)
+        for fd in self.writers.keys() - write_set:
+            _unwatch(loop, *self.writers.pop(fd), writing=True)
+        for fd in write_set - self.writers.keys():
+            self.writers[fd] = (_fileno(fd),
+                                functools.partial(self._on_writable, fd))
+            _watch(loop, *self.writers[fd], writing=True)
+
+        self.ready_readers = {}
+        self.ready_writers = {}
+        self.fut = loop.create_future()
+        timer = None
+        if timeout is not None:
+            timer = loop.call_later(timeout, _wake, self.fut)
+        try:
+            await_(self.fut)
+        finally:
+            self.fut = None
+            if timer is not None:
+                timer.cancel()
+        return list(self.ready_readers), list(self.ready_writers)
+
+    def discard(self, fd):
+        """Stop watching a file descriptor. This method must be called before
+        a file descriptor that is being watched is closed."""
+        if fd in self.readers:
+            _unwatch(self.loop, *self.readers.pop(fd))
+        if fd in self.writers:
+            _unwatch(self.loop, *self.writers.pop(fd), writing=True)
+
+    def close(self):
+        """Remove all the selector registrations."""
+        for fileno, callback in self.readers.values():
+            _unwatch(self.loop, fileno, callback)
+        for fileno, callback in self.writers.values():
+            _unwatch(self.loop, fileno, callback, writing=True)
+        self.readers = {}
+        self.writers = {}
 
 
 def wait_many(read_list, write_list, timeout=None):
-    readers = []
-    writers = []
-    event = asyncio.Event()
-
-    def _reader_callback(fd):
-        if fd not in readers:  # pragma: no branch
-            readers.append(fd)
-        event.set()
-
-    def _writer_callback(fd):
-        if fd not in writers:  # pragma: no branch
-            writers.append(fd)
-        event.set()
-
-    for fd in read_list:
-        asyncio.get_event_loop().add_reader(fd, _reader_callback, fd)
-    for fd in write_list:
-        asyncio.get_event_loop().add_writer(fd, _writer_callback, fd)
+    state = SelectorState()
     try:
-        await_(asyncio.wait_for(event.wait(), timeout))
-    except asyncio.TimeoutError:  # pragma: no cover
-        pass
-    for fd in read_list:
-        asyncio.get_event_loop().remove_reader(fd)
-    for fd in write_list:
-        asyncio.get_event_loop().remove_writer(fd)
-    return readers, writers
+        return state.wait(read_list, write_list, timeout)
+    finally:
+        state.close()
@@ -23,13 +23,14 @@ def patch_blocking(modules=None):
 
     :param modules: the list of modules to patch, or `None` to patch all the
                     supported modules, which at this time are ``socket``,
-                    ``select``, ``selectors``, ``ssl``, ``threading`` and
-                    ``time``.
+                    ``select``, ``selectors``, ``ssl``, ``threading``,
+                    ``time`` and ``queue``.
     """
     saved = {}
     saved_module_list = list(sys.modules.keys()).copy()
     if modules is None:
-        modules = ['socket', 'select', 'selectors', 'ssl', 'threading', 'time']
+        modules = ['socket', 'select', 'selectors', 'ssl', 'threading', 'time',
+                   'queue']
     for module in modules:
         if module not in patched:
             patched[module] = getattr(
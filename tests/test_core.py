@@ -1,9 +1,11 @@
 import asyncio
 import contextvars
 import inspect
+import time
 import unittest
 import pytest
-from greenletio import async_, await_
+from greenlet import greenlet, getcurrent
+from greenletio import async_, await_, spawn, GreenletPool
 from greenletio.core import bridge
 
 
@@ -142,6 +144,122 @@ class TestCore(unittest.TestCase):
 
         asyncio.run(b())
 
+    def test_async_pool(self):
+        pool = GreenletPool(max_size=2)
+
+        @async_(pool=pool)
+        def a(arg):
+            await_(asyncio.sleep(0))
+            return getcurrent(), arg
+
+        @async_(pool=pool)
+        def b(arg):
+            await_(asyncio.sleep(0))
+            raise RuntimeError(arg)
+
+        async def c():
+            gl1, ret = await a(1)
+            assert ret == 1
+            gl2, ret = await a(2)
+            assert ret == 2
+            assert gl1 is gl2
+            with pytest.raises(RuntimeError) as exc:
+                await b('foo')
+            assert str(exc.value) == 'foo'
+            assert len(pool.idle) == 1
+            assert pool.idle[0][0] is gl1
+
+            rets = await asyncio.gather(*[a(i) for i in range(5)])
+            assert [ret[1] for ret in rets] == list(range(5))
+            assert len(pool.idle) == 2
+            pool.clear()
+            assert len(pool.idle) == 0
+            assert gl1.dead
+
+        asyncio.run(c())
+
+    def test_async_pool_idle_timeout(self):
+        pool = GreenletPool(idle_timeout=0)
+
+        @async_(pool=pool)
+        def a():
+            return getcurrent()
+
+        async def b():
+            gl1 = await a()
+            gl2 = await a()
+            assert gl1 is not gl2
+            assert gl1.dead
+            assert len(pool.idle) == 0
+
+        asyncio.run(b())
+
+    def test_async_pool_evict_from_bridge(self):
+        pool = GreenletPool(idle_timeout=0.01)
+
+        @async_(pool=pool)
+        def a():
+            return getcurrent()
+
+        async def b():
+            return await a()
+
+        # the idle greenlet was last taken from the pool by the main
+        # greenlet, and it is evicted from the bridge while the main greenlet
+        # waits
+        gl1 = asyncio.run(b())
+        time.sleep(0.02)
+        gl2 = await_(a())
+        assert isinstance(gl2, greenlet)
+        assert gl2 is not gl1
+        assert gl1.dead
+
+    def test_async_pool_clear_from_greenlet(self):
+        pool = GreenletPool()
+
+        @async_(pool=pool)
+        def a():
+            return getcurrent()
+
+        @async_
+        def clear():
+            pool.clear()
+            return 'cleared'
+
+        async def b():
+            gl = await a()
+            assert len(pool.idle) == 1
+            assert await clear() == 'cleared'
+            assert len(pool.idle) == 0
+            assert gl.dead
+
+        asyncio.run(b())
+
+    def test_async_pool_with_context(self):
+        var = contextvars.ContextVar('var', default=1)
+        pool = GreenletPool()
+
+        @async_(with_context=True, pool=pool)
+        def a():
+            var.set(var.get() + 1)
+            return getcurrent()
+
+        @async_(pool=pool)
+        def b():
+            return getcurrent(), var.get()
+
+        async def c():
+            gl1 = await a()
+            assert var.get() == 2
+            gl2 = await a()
+            assert var.get() == 3
+            assert gl1 is gl2
+            gl3, value = await b()
+            assert gl3 is gl1
+            assert value == 1
+
+        asyncio.run(c())
+
     def test_gather_with_external_loop(self):
         var = 0
 
@@ -166,6 +284,29 @@ class TestCore(unittest.TestCase):
         ret = asyncio.run(c())
         assert ret == [1, 3] or ret == [3, 2]
 
+    def test_await_done_future(self):
+        @async_
+        def a(fut):
+            return await_(fut)
+
+        async def b():
+            fut = asyncio.get_event_loop().create_future()
+            fut.set_result(42)
+            assert (await a(fut)) == 42
+            fut = asyncio.get_event_loop().create_future()
+            fut.set_exception(RuntimeError('foo'))
+            with pytest.raises(RuntimeError) as exc:
+                await a(fut)
+            assert str(exc.value) == 'foo'
+
+            # a done future does not need a switch to the loop, so it can
+            # even be awaited from the asyncio task
+            fut = asyncio.get_event_loop().create_future()
+            fut.set_result(24)
+            assert await_(fut) == 24
+
+        asyncio.run(b())
+
     def test_await_raises_exception(self):
         async def a(arg):
             raise RuntimeError('foo')
@@ -220,6 +361,37 @@ class TestCore(unittest.TestCase):
         asyncio.run(c())
         assert bridge.bridge_greenlet is None
 
+    def test_spawn(self):
+        var = []
+
+        def a(i, delay=0):
+            await_(asyncio.sleep(delay))
+            var.append(i)
+            if i == 2:
+                raise ValueError(i)
+            return i * 2
+
+        @async_
+        def b():
+            tasks = [spawn(a, 0, delay=0.01), spawn(a, 1), spawn(a, 2)]
+            assert not tasks[0].done()
+            assert var == []
+            assert tasks[1].join() == 2
+            with pytest.raises(TimeoutError):
+                tasks[0].join(timeout=0.001)
+            assert tasks[0].join(timeout=1) == 0
+            with pytest.raises(ValueError):
+                tasks[2].join()
+            assert tasks[1].join() == 2
+            assert all(task.done() for task in tasks)
+            assert var == [1, 2, 0]
+
+        asyncio.run(b())
+
+    def test_spawn_with_internal_loop(self):
+        task = spawn(lambda x: x + 1, 41)
+        assert task.join() == 42
+
     def bad_await_with_internal_loop(self):
         async def a():
             with pytest.raises(RuntimeError):
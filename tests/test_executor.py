@@ -0,0 +1,128 @@
+import asyncio
+import concurrent.futures
+import unittest
+import pytest
+from greenletio import async_, GreenletExecutor
+from greenletio.core import bridge
+from greenletio.green import time
+
+
+class TestExecutor(unittest.TestCase):
+    def setUp(self):
+        pass
+
+    def tearDown(self):
+        bridge.stop()
+
+    def test_submit(self):
+        running = 0
+        max_running = 0
+
+        def task(i):
+            nonlocal running, max_running
+            running += 1
+            max_running = max(max_running, running)
+            time.sleep(0.001)
+            running -= 1
+            if i == 7:
+                raise ValueError(i)
+            return i * 2
+
+        @async_
+        def main():
+            with GreenletExecutor(max_workers=3) as executor:
+                futures = [executor.submit(task, i) for i in range(10)]
+                assert futures[0].result() == 0
+                assert futures[7].exception().args == (7,)
+                with pytest.raises(ValueError):
+                    futures[7].result()
+                assert [f.result() for f in futures if f != futures[7]] == \
+                    [0, 2, 4, 6, 8, 10, 12, 16, 18]
+                assert len(executor._threads) == 3
+            with pytest.raises(RuntimeError):
+                executor.submit(task, 1)
+
+        asyncio.run(main())
+        assert max_running == 3
+
+    def test_backpressure(self):
+        var = []
+
+        def task(i):
+            time.sleep(0.01)
+            var.append(i)
+
+        @async_
+        def main():
+            executor = GreenletExecutor(max_workers=2, queue_size=2)
+            for i in range(6):
+                executor.submit(task, i)
+                var.append('submitted')
+            executor.shutdown()
+
+        asyncio.run(main())
+        # submit() waits when the two workers are busy and two calls are
+        # queued
+        assert var == ['submitted'] * 4 + [0, 1, 'submitted', 'submitted',
+                                           2, 3, 4, 5]
+
+    def test_result_timeout(self):
+        @async_
+        def main():
+            with GreenletExecutor() as executor:
+                future = executor.submit(time.sleep, 0.05)
+                with pytest.raises(concurrent.futures.TimeoutError):
+                    future.result(timeout=0.01)
+                assert future.result(timeout=1) is None
+
+        asyncio.run(main())
+
+    def test_map(self):
+        submitted = []
+
+        def numbers():
+            for i in range(20):
+                submitted.append(i)
+                yield i
+
+        def task(a, b):
+            time.sleep(0.001 * (a % 3))
+            return a + b
+
+        @async_
+        def main():
+            with GreenletExecutor(max_workers=2) as executor:
+                results = executor.map(task, numbers(), range(100),
+                                       prefetch=4)
+                assert len(submitted) == 4
+                assert next(results) == 0
+                assert len(submitted) == 5
+                assert list(results) == [i * 2 for i in range(1, 20)]
+                with pytest.raises(ValueError):
+                    executor.map(task, [], [], prefetch=0)
+
+        asyncio.run(main())
+
+    def test_map_timeout(self):
+        @async_
+        def main():
+            with GreenletExecutor(max_workers=2) as executor:
+                results = executor.map(time.sleep, [0, 0.1, 0.1, 0.1],
+                                       timeout=0.02)
+                assert next(results) is None
+                with pytest.raises(concurrent.futures.TimeoutError):
+                    next(results)
+
+        asyncio.run(main())
+
+    def test_shutdown_cancel_futures(self):
+        @async_
+        def main():
+            executor = GreenletExecutor(max_workers=1)
+            futures = [executor.submit(time.sleep, 0.01) for i in range(3)]
+            executor.shutdown(cancel_futures=True)
+            assert futures[0].done() and not futures[0].cancelled()
+            assert futures[1].cancelled()
+            assert futures[2].cancelled()
+
+        asyncio.run(main())
@@ -4,7 +4,7 @@ import sys
 import unittest
 from greenletio import patch_blocking, patch_psycopg2
 from greenletio.green import socket as green_socket, \
-    threading as green_threading
+    threading as green_threading, queue as green_queue
 
 
 class TestPatcher(unittest.TestCase):
@@ -15,6 +15,7 @@ class TestPatcher(unittest.TestCase):
         with patch_blocking():
             assert sys.modules['socket'] == green_socket
             assert sys.modules['threading'] == green_threading
+            assert sys.modules['queue'] == green_queue
             import socketserver
             assert socketserver.socket == green_socket
             assert '__greenletio_patched__' in sys.modules
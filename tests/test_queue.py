@@ -0,0 +1,213 @@
+import unittest
+import pytest
+from greenletio.core import bridge
+from greenletio.green import queue, threading, time
+
+
+class TestQueue(unittest.TestCase):
+    def setUp(self):
+        pass
+
+    def tearDown(self):
+        bridge.stop()
+
+    def test_put_get(self):
+        q = queue.Queue()
+        var = []
+
+        def consumer():
+            for i in range(3):
+                var.append(q.get())
+                q.task_done()
+
+        def producer():
+            for i in range(3):
+                time.sleep(0.01)
+                q.put(i)
+
+        th1 = threading.Thread(target=consumer)
+        th2 = threading.Thread(target=producer)
+        th1.start()
+        th2.start()
+        q.join()
+        th1.join()
+        th2.join()
+        assert var == [0, 1, 2]
+        assert q.empty()
+        with pytest.raises(ValueError):
+            q.task_done()
+
+    def test_maxsize(self):
+        q = queue.Queue(2)
+        var = []
+
+        def producer():
+            for i in range(5):
+                q.put(i)
+
+        th = threading.Thread(target=producer)
+        th.start()
+        time.sleep(0.01)
+        assert q.full()
+        assert q.qsize() == 2
+        with pytest.raises(queue.Full):
+            q.put_nowait(5)
+        with pytest.raises(queue.Full):
+            q.put(5, timeout=0.01)
+        while len(var) < 5:
+            var.append(q.get())
+        th.join()
+        assert var == [0, 1, 2, 3, 4]
+        assert q.empty()
+
+    def test_timeout(self):
+        q = queue.Queue()
+        with pytest.raises(queue.Empty):
+            q.get_nowait()
+        with pytest.raises(queue.Empty):
+            q.get(timeout=0.01)
+        with pytest.raises(ValueError):
+            q.get(timeout=-1)
+        q.put_nowait('foo')
+        assert q.get(timeout=0.01) == 'foo'
+
+    def test_lifo_priority(self):
+        q = queue.LifoQueue()
+        for i in range(3):
+            q.put(i)
+        assert [q.get() for i in range(3)] == [2, 1, 0]
+
+        q = queue.PriorityQueue()
+        for i in [2, 0, 1]:
+            q.put(i)
+        assert [q.get() for i in range(3)] == [0, 1, 2]
+
+    def test_simple_queue(self):
+        q = queue.SimpleQueue()
+        var = None
+
+        def consumer():
+            nonlocal var
+            var = q.get()
+
+        th = threading.Thread(target=consumer)
+        th.start()
+        time.sleep(0.01)
+        q.put('foo')
+        th.join()
+        assert var == 'foo'
+        q.put('bar')
+        assert q.qsize() == 1
+        assert q.get() == 'bar'
+        assert q.empty()
+        with pytest.raises(queue.Empty):
+            q.get(timeout=0.01)
+        assert not hasattr(q, 'task_done')
+        assert not hasattr(q, 'join')
+
+    def test_mutex(self):
+        q = queue.Queue(2)
+        var = []
+
+        def producer():
+            for i in range(4):
+                q.put(i)
+
+        th = threading.Thread(target=producer)
+        th.start()
+        time.sleep(0.01)
+        assert q.full()
+        with q.mutex:
+            q.queue.clear()
+            q.unfinished_tasks = 0
+            q.all_tasks_done.notify_all()
+            q.not_full.notify_all()
+        q.join()
+        # the producer that was waiting is not stuck after the queue is
+        # cleared
+        while len(var) < 2:
+            var.append(q.get())
+        th.join()
+        assert var == [2, 3]
+
+    def test_conditions(self):
+        q = queue.Queue(1)
+        var = []
+
+        def wait_not_empty():
+            with q.not_empty:
+                while q.empty():
+                    q.not_empty.wait()
+            var.append('not empty')
+
+        def wait_not_full():
+            with q.not_full:
+                while q.full():
+                    q.not_full.wait()
+            var.append('not full')
+
+        th = threading.Thread(target=wait_not_empty)
+        th.start()
+        time.sleep(0.01)
+        q.put('foo')
+        th.join()
+        th = threading.Thread(target=wait_not_full)
+        th.start()
+        time.sleep(0.01)
+        assert q.get() == 'foo'
+        th.join()
+        assert var == ['not empty', 'not full']
+
+        def finish_task():
+            time.sleep(0.01)
+            q.task_done()
+
+        # join() waits on all_tasks_done while the task is not finished
+        th = threading.Thread(target=finish_task)
+        th.start()
+        q.join()
+        th.join()
+        assert q.unfinished_tasks == 0
+
+    @unittest.skipIf(not hasattr(queue, 'ShutDown'),
+                     'queue shutdown not available')
+    def test_shutdown(self):  # pragma: no cover
+        q = queue.Queue(1)
+        var = []
+
+        def getter():
+            with pytest.raises(queue.ShutDown):
+                q.get()
+            var.append('getter')
+
+        def putter():
+            with pytest.raises(queue.ShutDown):
+                q.put(2)
+            var.append('putter')
+
+        th = threading.Thread(target=getter)
+        th.start()
+        time.sleep(0.01)
+        q.shutdown()
+        th.join()
+        assert var == ['getter']
+
+        q = queue.Queue(1)
+        q.put(1)
+        th = threading.Thread(target=putter)
+        th.start()
+        time.sleep(0.01)
+        q.shutdown()
+        th.join()
+        assert var == ['getter', 'putter']
+        assert q.get() == 1
+        with pytest.raises(queue.ShutDown):
+            q.get()
+        with pytest.raises(queue.ShutDown):
+            q.put(3)
+
+        q = queue.Queue()
+        q.put(1)
+        q.shutdown(immediate=True)
+        q.join()
+        assert q.empty()
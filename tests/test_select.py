@@ -1,8 +1,10 @@
 import asyncio
+import gc
 import sys
 import unittest
+import pytest
 from greenletio.core import bridge, async_
-from greenletio.green import socket, selectors, time
+from greenletio.green import select, socket, selectors, time
 
 if not hasattr(asyncio, 'create_task'):
     asyncio.create_task = asyncio.ensure_future
@@ -15,12 +17,12 @@ class TestSelect(unittest.TestCase):
     def tearDown(self):
         bridge.stop()
 
-    def test_send_recv(self):
+    def _test_send_recv(self, selector_class):
         var = None
 
         @async_
         def server():
-            sel = selectors.DefaultSelector()
+            sel = selector_class()
             server_socket = socket.socket()
             server_socket.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
             server_socket.bind(('127.0.0.1', 7000))
@@ -49,6 +51,7 @@ class TestSelect(unittest.TestCase):
             assert events[0][0].events == selectors.EVENT_WRITE
             conn.sendall(data.upper())
             sel.unregister(conn)
+            sel.close()
             conn.close()
             server_socket.close()
 
@@ -74,3 +77,270 @@ class TestSelect(unittest.TestCase):
             asyncio.set_event_loop(loop)
         asyncio.run(main())
         assert var == b'HELLO'
+
+    def test_send_recv(self):
+        self._test_send_recv(selectors.DefaultSelector)
+
+    def test_send_recv_select(self):
+        self._test_send_recv(selectors.SelectSelector)
+
+    @unittest.skipIf(not hasattr(selectors, 'PollSelector'),
+                     'poll not available')
+    def test_send_recv_poll(self):
+        self._test_send_recv(selectors.PollSelector)
+
+    def test_selector_state(self):
+        @async_
+        def a():
+            sel = selectors.SelectSelector()
+            r1, w1 = socket.socketpair()
+            r2, w2 = socket.socketpair()
+            sel.register(r1, selectors.EVENT_READ)
+            sel.register(r2, selectors.EVENT_READ)
+            assert sel.select(timeout=0.01) == []
+            w2.send(b'x')
+            events = sel.select()
+            assert [key.fileobj for key, _ in events] == [r2]
+            r2.recv(1)
+
+            # registrations are kept between calls
+            loop = asyncio.get_event_loop()
+            assert loop._selector.get_key(r1.fileno())
+            sel.unregister(r1)
+            with pytest.raises(KeyError):
+                loop._selector.get_key(r1.fileno())
+            sel.close()
+            with pytest.raises(KeyError):
+                loop._selector.get_key(r2.fileno())
+            for s in [r1, w1, r2, w2]:
+                s.close()
+
+        asyncio.run(a())
+
+    def test_select_between_recvs(self):
+        r, w = socket.socketpair()
+        var = []
+
+        @async_
+        def reader():
+            r.settimeout(1)
+            var.append(r.recv(1))
+            assert select.select([r], [], [], 1) == ([r], [], [])
+            var.append(r.recv(1))
+            # the socket must still be woken up after the select call
+            var.append(r.recv(1))
+
+        @async_
+        def writer():
+            for data in [b'a', b'b', b'c']:
+                time.sleep(0.01)
+                w.send(data)
+
+        async def main():
+            await asyncio.gather(reader(), writer())
+
+        asyncio.run(main())
+        r.close()
+        w.close()
+        assert var == [b'a', b'b', b'c']
+
+    def test_selector_between_recvs(self):
+        r, w = socket.socketpair()
+        var = []
+
+        @async_
+        def reader():
+            sel = selectors.SelectSelector()
+            sel.register(r, selectors.EVENT_READ)
+            r.settimeout(1)
+            assert [key.fileobj for key, _ in sel.select(1)] == [r]
+            var.append(r.recv(1))
+            var.append(r.recv(1))
+            # the selector must still be woken up after the socket waited
+            assert [key.fileobj for key, _ in sel.select(1)] == [r]
+            var.append(r.recv(1))
+            sel.close()
+
+        @async_
+        def writer():
+            for data in [b'a', b'b', b'c']:
+                time.sleep(0.01)
+                w.send(data)
+
+        async def main():
+            await asyncio.gather(reader(), writer())
+
+        asyncio.run(main())
+        r.close()
+        w.close()
+        assert var == [b'a', b'b', b'c']
+
+    def test_close_registered_socket(self):
+        @async_
+        def a():
+            r, w = socket.socketpair()
+            fd = r.fileno()
+            sel = selectors.SelectSelector()
+            sel.register(r, selectors.EVENT_READ)
+            assert sel.select(timeout=0.01) == []
+            # the socket is closed while the selector still watches it
+            r.close()
+            w.close()
+            loop = asyncio.get_event_loop()
+            with pytest.raises(KeyError):
+                loop._selector.get_key(fd)
+
+            # a new socket that reuses the file descriptor can wait on it
+            r, w = socket.socketpair()
+            assert r.fileno() == fd
+            r.settimeout(1)
+            loop.call_later(0.01, w.send, b'x')
+            assert r.recv(1) == b'x'
+            sel.close()
+            r.close()
+            w.close()
+
+        asyncio.run(a())
+
+    @unittest.skipIf(not hasattr(select, 'poll'), 'poll not available')
+    def test_close_poll_with_registered_fds(self):
+        @async_
+        def a():
+            loop = asyncio.get_event_loop()
+            r, w = socket.socketpair()
+            fd = r.fileno()
+            with selectors.PollSelector() as sel:
+                sel.register(r, selectors.EVENT_READ)
+                assert sel.select(0.01) == []
+                assert loop._selector.get_key(fd)
+            with pytest.raises(KeyError):
+                loop._selector.get_key(fd)
+
+            p = select.poll()
+            p.register(r, select.POLLIN)
+            assert p.poll(10) == []
+            assert loop._selector.get_key(fd)
+            del p
+            gc.collect()
+            with pytest.raises(KeyError):
+                loop._selector.get_key(fd)
+
+            if hasattr(select, 'epoll'):
+                ep = select.epoll()
+                ep.register(fd, select.EPOLLIN)
+                assert ep.poll(0.01) == []
+                epoll_fd = ep.fileno()
+                assert loop._selector.get_key(epoll_fd)
+                del ep
+                gc.collect()
+                with pytest.raises(KeyError):
+                    loop._selector.get_key(epoll_fd)
+
+            # the file descriptor can be reused after the socket is closed
+            r.close()
+            w.close()
+            r, w = socket.socketpair()
+            assert r.fileno() == fd
+            r.settimeout(1)
+            loop.call_later(0.01, w.send, b'x')
+            assert r.recv(1) == b'x'
+            r.close()
+            w.close()
+
+        asyncio.run(a())
+
+    @unittest.skipIf(not hasattr(select, 'epoll'), 'epoll not available')
+    def test_epoll(self):
+        var = None
+
+        @async_
+        def server():
+            nonlocal var
+            ep = select.epoll()
+            server_socket = socket.socket()
+            server_socket.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+            server_socket.bind(('127.0.0.1', 7000))
+            server_socket.listen(5)
+            ep.register(server_socket.fileno(), select.EPOLLIN)
+            assert ep.poll(0) == []
+            assert ep.poll(0.01) == []
+            events = ep.poll()
+            assert events == [(server_socket.fileno(), select.EPOLLIN)]
+            conn, _ = server_socket.accept()
+            ep.modify(server_socket.fileno(), select.EPOLLOUT)
+            ep.unregister(server_socket.fileno())
+            ep.register(conn.fileno(), select.EPOLLIN)
+            events = ep.poll(timeout=-1, maxevents=1)
+            assert events == [(conn.fileno(), select.EPOLLIN)]
+            var = conn.recv(1024)
+            conn.close()
+            ep.close()
+            assert ep.closed
+            server_socket.close()
+
+        @async_
+        def client():
+            client_socket = socket.socket()
+            time.sleep(0.1)
+            client_socket.connect(('127.0.0.1', 7000))
+            time.sleep(0.1)
+            client_socket.sendall(b'hello')
+            client_socket.close()
+
+        async def main():
+            asyncio.create_task(server())
+            asyncio.create_task(client())
+            while var is None:
+                await asyncio.sleep(0)
+
+        asyncio.run(main())
+        assert var == b'hello'
+        assert selectors.DefaultSelector == selectors.EpollSelector
+
+    @unittest.skipIf(not hasattr(select, 'poll'), 'poll not available')
+    def test_poll(self):
+        var = None
+
+        @async_
+        def server():
+            nonlocal var
+            p = select.poll()
+            server_socket = socket.socket()
+            server_socket.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+            server_socket.bind(('127.0.0.1', 7000))
+            server_socket.listen(5)
+            p.register(server_socket, select.POLLIN)
+            assert p.poll(0) == []
+            assert p.poll(10) == []
+            events = p.poll()
+            assert events == [(server_socket.fileno(), select.POLLIN)]
+            conn, _ = server_socket.accept()
+            p.unregister(server_socket)
+            p.register(conn)
+            p.modify(conn, select.POLLOUT)
+            events = p.poll(-1)
+            assert events == [(conn.fileno(), select.POLLOUT)]
+            p.modify(conn, select.POLLIN)
+            events = p.poll()
+            assert events == [(conn.fileno(), select.POLLIN)]
+            var = conn.recv(1024)
+            conn.close()
+            server_socket.close()
+
+        @async_
+        def client():
+            client_socket = socket.socket()
+            time.sleep(0.1)
+            client_socket.connect(('127.0.0.1', 7000))
+            time.sleep(0.1)
+            client_socket.sendall(b'hello')
+            client_socket.close()
+
+        async def main():
+            asyncio.create_task(server())
+            asyncio.create_task(client())
+            while var is None:
+                await asyncio.sleep(0)
+
+        asyncio.run(main())
+        assert var == b'hello'
@@ -1,6 +1,13 @@
 import asyncio
+import errno
+import io
+import selectors
 import sys
+import tempfile
+import time
 import unittest
+from unittest import mock
+import pytest
 from greenletio.core import bridge, async_
 from greenletio.green import socket
 
@@ -82,3 +89,337 @@ class TestSocket(unittest.TestCase):
             asyncio.set_event_loop(loop)
         asyncio.run(main())
         assert var == b'HELLO'
+
+    def test_persistent_registration(self):
+        var = None
+
+        @async_
+        def server():
+            server_socket = socket.socket()
+            server_socket.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+            server_socket.bind(('127.0.0.1', 7000))
+            server_socket.listen(5)
+            conn, _ = server_socket.accept()
+            for i in range(3):
+                conn.sendall(conn.recv(1))
+            fd = conn.fileno()
+            selector = asyncio.get_event_loop()._selector
+            assert selector.get_key(fd).events & selectors.EVENT_READ
+            conn.close()
+            with pytest.raises(KeyError):
+                selector.get_key(fd)
+            server_socket.close()
+
+        @async_
+        def client():
+            nonlocal var
+            client_socket = socket.socket()
+            client_socket.connect(('127.0.0.1', 7000))
+            data = b''
+            for c in b'abc':
+                client_socket.sendall(bytes([c]))
+                data += client_socket.recv(1)
+            var = data
+            client_socket.close()
+
+        async def main():
+            asyncio.create_task(server())
+            asyncio.create_task(client())
+            while var is None:
+                await asyncio.sleep(0)
+
+        if sys.platform == 'win32':
+            loop = asyncio.SelectorEventLoop()
+            asyncio.set_event_loop(loop)
+        asyncio.run(main())
+        assert var == b'abc'
+
+    def test_blocking_mode(self):
+        a, b = socket.socketpair()
+        assert isinstance(a, socket.socket)
+        assert a.gettimeout() is None
+        assert a.getblocking()
+        a.settimeout(2)
+        assert a.gettimeout() == 2.0 and a.timeout == 2.0
+        with pytest.raises(ValueError):
+            a.settimeout(-1)
+        a.setblocking(False)
+        assert a.gettimeout() == 0.0
+        assert not a.getblocking()
+        with pytest.raises(BlockingIOError):
+            a.recv(1)
+        b.sendall(b'x')
+        assert a.recv(1) == b'x'
+        a.setblocking(True)
+        assert a.gettimeout() is None
+        a.close()
+        b.close()
+
+    def test_sendall_large(self):
+        a, b = socket.socketpair()
+        a.setsockopt(socket.SOL_SOCKET, socket.SO_SNDBUF, 4096)
+        data = bytes(range(256)) * 4096
+        var = bytearray()
+
+        @async_
+        def sender():
+            a.sendall(data)
+            a.sendall_vectored([b'head', memoryview(data), b'', b'tail'])
+            a.close()
+
+        @async_
+        def receiver():
+            while True:
+                chunk = b.recv(65536)
+                if not chunk:
+                    break
+                var.extend(chunk)
+            b.close()
+
+        async def main():
+            await asyncio.gather(sender(), receiver())
+
+        asyncio.run(main())
+        assert var == data + b'head' + data + b'tail'
+
+    def test_sendfile(self):
+        class ReadOnlyFile:
+            def __init__(self, data):
+                self.f = io.BytesIO(data)
+
+            def read(self, size):
+                return self.f.read(size)
+
+        a, b = socket.socketpair()
+        a.setsockopt(socket.SOL_SOCKET, socket.SO_SNDBUF, 4096)
+        data = bytes(range(256)) * 4096
+        var = bytearray()
+
+        @async_
+        def sender():
+            with tempfile.TemporaryFile() as f:
+                f.write(data)
+                assert a.sendfile(f) == len(data)
+                assert f.tell() == len(data)
+                assert a.sendfile(f, 1000, 5000) == 5000
+                assert f.tell() == 6000
+            # a file without a file descriptor cannot use os.sendfile()
+            f = io.BytesIO(data)
+            assert a.sendfile(f, 10) == len(data) - 10
+            # a file object that only implements read()
+            f = ReadOnlyFile(data)
+            assert a.sendfile(f, count=3000) == 3000
+            a.close()
+
+        @async_
+        def receiver():
+            while True:
+                chunk = b.recv(65536)
+                if not chunk:
+                    break
+                var.extend(chunk)
+            b.close()
+
+        async def main():
+            await asyncio.gather(sender(), receiver())
+
+        asyncio.run(main())
+        assert var == data + data[1000:6000] + data[10:] + data[:3000]
+
+    def test_timeout(self):
+        a, b = socket.socketpair()
+        a.settimeout(0.05)
+
+        @async_
+        def c():
+            with pytest.raises(socket.timeout):
+                a.recv(1)
+            assert a._watcher.reader is None
+            b.sendall(b'x')
+            assert a.recv(1) == b'x'
+            with pytest.raises(socket.timeout):
+                a.sendall(b'x' * 10000000)
+
+            server = socket.socket()
+            server.bind(('127.0.0.1', 0))
+            port = server.getsockname()[1]
+            server.close()
+            with pytest.raises(ConnectionRefusedError):
+                socket.create_connection(('127.0.0.1', port), timeout=0.5)
+            d = socket.socket()
+            assert d.connect_ex(('127.0.0.1', port)) == errno.ECONNREFUSED
+            d.close()
+
+        asyncio.run(c())
+        a.close()
+        b.close()
+
+    def test_resolver(self):
+        original_socket = socket._original_socket_
+        socket._resolver.clear()
+
+        @async_
+        def a():
+            with mock.patch.object(original_socket, 'getaddrinfo',
+                                   wraps=original_socket.getaddrinfo) as gai:
+                addrs = socket.getaddrinfo('localhost', 80, socket.AF_INET,
+                                           socket.SOCK_STREAM)
+                assert addrs[0][4] == ('127.0.0.1', 80)
+                assert socket.getaddrinfo(
+                    'localhost', 80, socket.AF_INET,
+                    socket.SOCK_STREAM) == addrs
+                assert gai.call_count == 1
+
+                # numeric addresses do not use the resolver
+                addrs = socket.getaddrinfo('127.0.0.1', 80, socket.AF_INET,
+                                           socket.SOCK_STREAM)
+                assert addrs[0][4] == ('127.0.0.1', 80)
+                assert gai.call_count == 2
+                assert len(socket._resolver.cache) == 1
+
+                # expired entries are resolved again
+                socket._resolver.ttl = 0
+                socket.getaddrinfo('localhost', 81)
+                socket.getaddrinfo('localhost', 81)
+                assert gai.call_count == 4
+                socket._resolver.ttl = 60
+
+            assert socket.gethostbyname('localhost') == '127.0.0.1'
+            assert socket.gethostbyname('127.0.0.1') == '127.0.0.1'
+            with pytest.raises(socket.gaierror):
+                socket.getaddrinfo('invalid.invalid', 80)
+            assert socket.getnameinfo(
+                ('127.0.0.1', 80),
+                socket.NI_NUMERICHOST | socket.NI_NUMERICSERV) == \
+                ('127.0.0.1', '80')
+
+        async def b():
+            await a()
+
+        asyncio.run(b())
+        socket._resolver.clear()
+
+    def test_create_connection_happy_eyeballs(self):
+        # a server with a full backlog does not complete new connections
+        slow_server = socket.socket()
+        slow_server.bind(('127.0.0.1', 0))
+        slow_server.listen(0)
+        slow_addr = slow_server.getsockname()
+        fillers = [socket.socket(), socket.socket()]
+        for filler in fillers:
+            filler.setblocking(False)
+            filler.connect_ex(slow_addr)
+        server = socket.socket()
+        server.bind(('127.0.0.1', 0))
+        server.listen()
+        addr = server.getsockname()
+        closed = socket.socket()
+        closed.bind(('127.0.0.1', 0))
+        closed_addr = closed.getsockname()
+        closed.close()
+
+        def addrinfo(addr):
+            return (socket.AF_INET, socket.SOCK_STREAM, 6, '', addr)
+
+        @async_
+        def a():
+            with mock.patch.object(socket, 'getaddrinfo', return_value=[
+                    addrinfo(slow_addr), addrinfo(addr)]):
+                start = time.monotonic()
+                sock = socket.create_connection(('example.com', 80),
+                                                happy_eyeballs_delay=0.05)
+                assert time.monotonic() - start < 1
+                assert sock.getpeername() == addr
+                sock.close()
+
+            with mock.patch.object(socket, 'getaddrinfo', return_value=[
+                    addrinfo(closed_addr), addrinfo(addr)]):
+                sock = socket.create_connection(('example.com', 80))
+                assert sock.getpeername() == addr
+                sock.close()
+
+            with mock.patch.object(socket, 'getaddrinfo', return_value=[
+                    addrinfo(closed_addr), addrinfo(closed_addr)]):
+                with pytest.raises(ConnectionRefusedError):
+                    socket.create_connection(('example.com', 80))
+                if sys.version_info >= (3, 11):
+                    with pytest.raises(ExceptionGroup) as exc:  # noqa: F821
+                        socket.create_connection(('example.com', 80),
+                                                 all_errors=True)
+                    assert len(exc.value.exceptions) == 2
+                with pytest.raises(ConnectionRefusedError):
+                    socket.create_connection(('example.com', 80),
+                                             happy_eyeballs_delay=None)
+
+        async def b():
+            await a()
+
+        asyncio.run(b())
+        for sock in fillers + [slow_server, server]:
+            sock.close()
+
+    def test_interleave_addrinfos(self):
+        addrinfos = [(socket.AF_INET6, 1), (socket.AF_INET6, 2),
+                     (socket.AF_INET6, 3), (socket.AF_INET, 4),
+                     (socket.AF_INET, 5)]
+        assert socket._interleave_addrinfos(addrinfos) == [
+            (socket.AF_INET6, 1), (socket.AF_INET, 4), (socket.AF_INET6, 2),
+            (socket.AF_INET, 5), (socket.AF_INET6, 3)]
+
+    def test_accept_many(self):
+        server = socket.socket()
+        server.bind(('127.0.0.1', 0))
+        server.listen()
+        addr = server.getsockname()
+
+        @async_
+        def a():
+            clients = [socket.create_connection(addr) for i in range(5)]
+            conns = server.accept_many(3)
+            assert len(conns) == 3
+            conns += server.accept_many()
+            assert len(conns) == 5
+            assert sorted(address for _, address in conns) == \
+                sorted(client.getsockname() for client in clients)
+            for conn, _ in conns:
+                assert isinstance(conn, socket.socket)
+                conn.close()
+            for client in clients:
+                client.close()
+
+        async def b():
+            await a()
+
+        asyncio.run(b())
+        server.close()
+
+    def test_accept_many_subclass(self):
+        class Connection(socket.socket):
+            pass
+
+        class Server(socket.socket):
+            def _accepted(self, fd):
+                return Connection(self.family, self.type, self.proto,
+                                  fileno=fd)
+
+        server = Server()
+        server.bind(('127.0.0.1', 0))
+        server.listen()
+        addr = server.getsockname()
+
+        @async_
+        def a():
+            clients = [socket.create_connection(addr) for i in range(3)]
+            conns = server.accept_many()
+            assert len(conns) == 3
+            for conn, _ in conns:
+                assert isinstance(conn, Connection)
+                conn.close()
+            for client in clients:
+                client.close()
+
+        async def b():
+            await a()
+
+        asyncio.run(b())
+        server.close()
@@ -1,8 +1,10 @@
 import asyncio
 import sys
+import tempfile
 import unittest
+from unittest import mock
 from greenletio.core import bridge, async_
-from greenletio.green import socket, ssl
+from greenletio.green import socket, ssl, time
 
 # Tests in this module use server and client certificates
 #
@@ -69,3 +71,334 @@ class TestSSL(unittest.TestCase):
             asyncio.set_event_loop(loop)
         asyncio.run(main())
         assert var == b'HELLO'
+
+    def test_sendfile(self):
+        var = None
+        data = bytes(range(256)) * 1024
+
+        @async_
+        def server():
+            server_socket = socket.socket()
+            server_socket.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+            server_socket.bind(('127.0.0.1', 7000))
+            server_socket.listen(5)
+            context = ssl.create_default_context(ssl.Purpose.CLIENT_AUTH)
+            context.load_cert_chain('tests/server.crt', 'tests/server.key')
+            context.load_verify_locations('tests/client.crt')
+            ssl_socket = context.wrap_socket(server_socket, server_side=True)
+            conn, _ = ssl_socket.accept()
+            with tempfile.TemporaryFile() as f:
+                f.write(data)
+                assert conn.sendfile(f, 1000, 100000) == 100000
+                assert f.tell() == 101000
+            conn.close()
+            ssl_socket.close()
+
+        @async_
+        def client():
+            nonlocal var
+            client_socket = socket.socket()
+            context = ssl.create_default_context(ssl.Purpose.SERVER_AUTH,
+                                                 cafile='tests/server.crt')
+            context.load_cert_chain('tests/client.crt', 'tests/client.key')
+            ssl_socket = context.wrap_socket(client_socket,
+                                             server_hostname='example.com')
+            ssl_socket.connect(('127.0.0.1', 7000))
+            received = b''
+            while len(received) < 100000:
+                received += ssl_socket.recv(65536)
+            ssl_socket.close()
+            var = received
+
+        async def main():
+            asyncio.create_task(server())
+            asyncio.create_task(client())
+            while var is None:
+                await asyncio.sleep(0)
+
+        if sys.platform == 'win32':
+            loop = asyncio.SelectorEventLoop()
+            asyncio.set_event_loop(loop)
+        asyncio.run(main())
+        assert var == data[1000:101000]
+
+    def test_buffered_recv(self):
+        var = None
+
+        @async_
+        def server():
+            server_socket = socket.socket()
+            server_socket.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+            server_socket.bind(('127.0.0.1', 7000))
+            server_socket.listen(5)
+            context = ssl.create_default_context(ssl.Purpose.CLIENT_AUTH)
+            context.load_cert_chain('tests/server.crt', 'tests/server.key')
+            context.load_verify_locations('tests/client.crt')
+            ssl_socket = context.wrap_socket(server_socket, server_side=True)
+            conn, _ = ssl_socket.accept()
+            conn.sendall(b'hello world\nfoo\nbar\n')
+            conn.close()
+            ssl_socket.close()
+
+        @async_
+        def client():
+            nonlocal var
+            client_socket = socket.socket()
+            context = ssl.create_default_context(ssl.Purpose.SERVER_AUTH,
+                                                 cafile='tests/server.crt')
+            context.load_cert_chain('tests/client.crt', 'tests/client.key')
+            ssl_socket = context.wrap_socket(client_socket,
+                                             server_hostname='example.com')
+            ssl_socket.connect(('127.0.0.1', 7000))
+            data = ssl_socket.recv(5)
+            assert ssl_socket.pending() == 15
+            buffer = bytearray(4)
+            assert ssl_socket.recv_into(buffer) == 4
+            data += buffer
+            assert ssl_socket.recv_into(buffer, 2) == 2
+            data += buffer[:2]
+            f = ssl_socket.makefile('rb')
+            data += f.readline()
+            data += f.read()
+            f.close()
+            ssl_socket.close()
+            var = data
+
+        async def main():
+            asyncio.create_task(server())
+            asyncio.create_task(client())
+            while var is None:
+                await asyncio.sleep(0)
+
+        if sys.platform == 'win32':
+            loop = asyncio.SelectorEventLoop()
+            asyncio.set_event_loop(loop)
+        asyncio.run(main())
+        assert var == b'hello world\nfoo\nbar\n'
+
+    def test_memory_bio(self):
+        var = None
+
+        @async_
+        def server():
+            server_socket = socket.socket()
+            server_socket.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+            server_socket.bind(('127.0.0.1', 7000))
+            server_socket.listen(5)
+            context = ssl.create_default_context(ssl.Purpose.CLIENT_AUTH)
+            context.load_cert_chain('tests/server.crt', 'tests/server.key')
+            context.load_verify_locations('tests/client.crt')
+            context.sslsocket_class = ssl.MemoryBIOSocket
+            ssl_socket = context.wrap_socket(server_socket, server_side=True)
+            conn, _ = ssl_socket.accept()
+            assert isinstance(conn, ssl.MemoryBIOSocket)
+            conn.sendall_vectored([b'hello ', b'world\n', b'foo\n'])
+            with tempfile.TemporaryFile() as f:
+                f.write(b'bar\n' * 10000)
+                f.seek(0)
+                conn.sendfile(f)
+            data = conn.recv(1024)
+            while len(data) < 100000:
+                data += conn.recv(1024)
+            conn.sendall(data[:1000])
+            conn.close()
+            ssl_socket.close()
+
+        @async_
+        def client():
+            nonlocal var
+            client_socket = socket.socket()
+            context = ssl.create_default_context(ssl.Purpose.SERVER_AUTH,
+                                                 cafile='tests/server.crt')
+            context.load_cert_chain('tests/client.crt', 'tests/client.key')
+            context.sslsocket_class = ssl.MemoryBIOSocket
+            ssl_socket = context.wrap_socket(client_socket,
+                                             server_hostname='example.com')
+            ssl_socket.connect(('127.0.0.1', 7000))
+            assert ssl_socket.version().startswith('TLS')
+            assert ssl_socket.cipher() is not None
+            assert ssl_socket.getpeercert()['subject'] is not None
+            f = ssl_socket.makefile('rb')
+            data = f.readline() + f.readline()
+            lines = [f.readline() for i in range(10000)]
+            assert lines == [b'bar\n'] * 10000
+            ssl_socket.sendall(b'x' * 100000)
+            assert f.read() == b'x' * 1000
+            f.close()
+            ssl_socket.close()
+            var = data
+
+        async def main():
+            asyncio.create_task(server())
+            asyncio.create_task(client())
+            while var is None:
+                await asyncio.sleep(0)
+
+        if sys.platform == 'win32':
+            loop = asyncio.SelectorEventLoop()
+            asyncio.set_event_loop(loop)
+        asyncio.run(main())
+        assert var == b'hello world\nfoo\n'
+
+    def _test_session_cache(self, sslsocket_class):
+        var = None
+
+        @async_
+        def server():
+            server_socket = socket.socket()
+            server_socket.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+            server_socket.bind(('127.0.0.1', 7000))
+            server_socket.listen(5)
+            context = ssl.create_default_context(ssl.Purpose.CLIENT_AUTH)
+            context.load_cert_chain('tests/server.crt', 'tests/server.key')
+            context.sslsocket_class = sslsocket_class
+            ssl_socket = context.wrap_socket(server_socket, server_side=True)
+            for i in range(3):
+                conn, _ = ssl_socket.accept()
+                conn.sendall(conn.recv(1024))
+                conn.close()
+            ssl_socket.close()
+
+        @async_
+        def client():
+            nonlocal var
+            context = ssl.create_default_context(ssl.Purpose.SERVER_AUTH,
+                                                 cafile='tests/server.crt')
+            context.sslsocket_class = sslsocket_class
+            context.session_cache = ssl.SessionCache()
+            reused = []
+            for i in range(3):
+                if i < 2:
+                    ssl_socket = context.wrap_socket(
+                        socket.socket(), server_hostname='example.com')
+                    ssl_socket.connect(('127.0.0.1', 7000))
+                else:
+                    # sockets that are connected before they are wrapped
+                    # also use the cache
+                    ssl_socket = context.wrap_socket(
+                        socket.create_connection(('127.0.0.1', 7000)),
+                        server_hostname='example.com')
+                ssl_socket.sendall(b'hello')
+                assert ssl_socket.recv(1024) == b'hello'
+                reused.append(ssl_socket.session_reused)
+                ssl_socket.close()
+            assert context.session_cache.hits == 2
+            assert context.session_cache.misses == 1
+            assert context.session_cache.hit_rate == 2 / 3
+            var = reused
+
+        async def main():
+            asyncio.create_task(server())
+            asyncio.create_task(client())
+            while var is None:
+                await asyncio.sleep(0)
+
+        if sys.platform == 'win32':
+            loop = asyncio.SelectorEventLoop()
+            asyncio.set_event_loop(loop)
+        asyncio.run(main())
+        assert var == [False, True, True]
+
+    def test_memory_bio_accept_many(self):
+        var = None
+
+        @async_
+        def server():
+            nonlocal var
+            server_socket = socket.socket()
+            server_socket.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+            server_socket.bind(('127.0.0.1', 7000))
+            server_socket.listen(5)
+            context = ssl.create_default_context(ssl.Purpose.CLIENT_AUTH)
+            context.load_cert_chain('tests/server.crt', 'tests/server.key')
+            context.sslsocket_class = ssl.MemoryBIOSocket
+            ssl_socket = context.wrap_socket(server_socket, server_side=True)
+            # let all the clients connect before accepting
+            time.sleep(0.1)
+            conns = ssl_socket.accept_many()
+            var = [type(conn) for conn, _ in conns]
+            for conn, _ in conns:
+                conn.sendall(b'hello')
+                conn.close()
+            ssl_socket.close()
+
+        @async_
+        def client(delay):
+            client_socket = socket.socket()
+            context = ssl.create_default_context(ssl.Purpose.SERVER_AUTH,
+                                                 cafile='tests/server.crt')
+            ssl_socket = context.wrap_socket(client_socket,
+                                             server_hostname='example.com')
+            time.sleep(delay)
+            ssl_socket.connect(('127.0.0.1', 7000))
+            assert ssl_socket.recv(5) == b'hello'
+            ssl_socket.close()
+
+        @async_
+        def plain_client(delay):
+            # a client that does not speak TLS fails its handshake, which
+            # must not affect the other connections accepted with it
+            client_socket = socket.socket()
+            time.sleep(delay)
+            client_socket.connect(('127.0.0.1', 7000))
+            client_socket.sendall(b'GET / HTTP/1.0\r\n\r\n')
+            while client_socket.recv(1024):
+                pass
+            client_socket.close()
+
+        async def main():
+            asyncio.create_task(server())
+            asyncio.create_task(client(0.01))
+            asyncio.create_task(plain_client(0.02))
+            asyncio.create_task(client(0.03))
+            asyncio.create_task(client(0.04))
+            while var is None:
+                await asyncio.sleep(0)
+
+        if sys.platform == 'win32':
+            loop = asyncio.SelectorEventLoop()
+            asyncio.set_event_loop(loop)
+        asyncio.run(main())
+        assert var == [ssl.MemoryBIOSocket] * 3
+
+    def test_session_cache(self):
+        self._test_session_cache(ssl.SSLSocket)
+
+    def test_session_cache_memory_bio(self):
+        self._test_session_cache(ssl.MemoryBIOSocket)
+
+    @unittest.skipIf(not hasattr(socket, 'AF_UNIX'), 'AF_UNIX not supported')
+    def test_session_cache_unix_socket(self):
+        # sessions are cached by port, so unix sockets do not use the cache
+        for sslsocket_class in [ssl.SSLSocket, ssl.MemoryBIOSocket]:
+            context = ssl.create_default_context(ssl.Purpose.SERVER_AUTH,
+                                                 cafile='tests/server.crt')
+            context.sslsocket_class = sslsocket_class
+            context.session_cache = ssl.SessionCache()
+            a, b = socket.socketpair()
+            ssl_socket = context.wrap_socket(a, server_hostname='example.com',
+                                             do_handshake_on_connect=False)
+            assert ssl_socket.session is None
+            ssl_socket.close()
+            b.close()
+            assert context.session_cache.misses == 0
+
+    def test_session_cache_eviction(self):
+        session = mock.MagicMock(timeout=7200)
+        short_session = mock.MagicMock(timeout=0)
+        cache = ssl.SessionCache(maxsize=2, ttl=60)
+        assert cache.hit_rate == 0.0
+        cache.put('a', 443, session)
+        cache.put('b', 443, session)
+        assert cache.get('a', 443) is session
+        cache.put('c', 443, session)
+        assert cache.get('b', 443) is None
+        assert cache.get('a', 443) is session
+        assert cache.get('c', 443) is session
+        cache.put('d', 443, short_session)
+        assert cache.get('d', 443) is None
+        with mock.patch.object(ssl.time, 'monotonic',
+                               return_value=ssl.time.monotonic() + 60):
+            assert cache.get('a', 443) is None
+        cache.clear()
+        assert cache.get('c', 443) is None
@@ -1,6 +1,10 @@
+import _thread
+import asyncio
+import gc
 import unittest
+import weakref
 import pytest
-from greenletio.core import bridge
+from greenletio.core import async_, bridge, GreenletPool
 from greenletio.green import threading, time
 
 
@@ -40,6 +44,19 @@ class TestThreading(unittest.TestCase):
         th2.join()
         assert var == 'bar'
 
+    def test_uncontended_lock(self):
+        lock = threading.Lock()
+        assert lock.acquire() is True
+        assert lock.locked()
+        assert lock.acquire(blocking=False) is False
+        lock.release()
+        assert not lock.locked()
+        with lock:
+            assert lock.locked()
+
+        # no switches to the asyncio loop were needed
+        assert bridge.bridge_greenlet is None
+
     def test_rlock(self):
         var = None
         lock = threading.RLock()
@@ -101,6 +118,64 @@ class TestThreading(unittest.TestCase):
         th2.join()
         assert var == 'bar'
 
+    def test_condition_notify(self):
+        var = []
+        cv = threading.Condition(threading.Lock())
+
+        def consumer(n):
+            with cv:
+                if n == 0:
+                    assert cv.wait(timeout=0.01) is False
+                else:
+                    assert cv.wait() is True
+                    var.append(n)
+
+        def producer():
+            time.sleep(0.05)
+            with cv:
+                cv.notify(2)
+            time.sleep(0.05)
+            assert var == [1, 2]
+            with cv:
+                cv.notify_all()
+
+        ths = [threading.Thread(target=consumer, args=(i,)) for i in range(5)]
+        ths.append(threading.Thread(target=producer))
+        for th in ths:
+            th.start()
+        for th in ths:
+            th.join()
+        assert var == [1, 2, 3, 4]
+
+    def test_condition_other_lock(self):
+        var = []
+        cv = threading.Condition(_thread.allocate_lock())
+
+        def consumer(n):
+            with cv:
+                if n == 0:
+                    assert cv.wait(timeout=0.01) is False
+                else:
+                    assert cv.wait() is True
+                    var.append(n)
+
+        def producer():
+            time.sleep(0.05)
+            with cv:
+                cv.notify(2)
+            time.sleep(0.05)
+            assert var == [1, 2]
+            with cv:
+                cv.notify_all()
+
+        ths = [threading.Thread(target=consumer, args=(i,)) for i in range(4)]
+        ths.append(threading.Thread(target=producer))
+        for th in ths:
+            th.start()
+        for th in ths:
+            th.join()
+        assert var == [1, 2, 3]
+
     def test_semaphore(self):
         var = None
         sem = threading.Semaphore()
@@ -249,6 +324,26 @@ class TestThreading(unittest.TestCase):
         with pytest.raises(AttributeError):
             local.var
 
+    def test_local_pool(self):
+        pool = GreenletPool()
+        local = threading.local()
+
+        @async_(pool=pool)
+        def fn(n):
+            # a pooled greenlet does not keep the data of the previous call
+            assert not hasattr(local, 'var')
+            local.var = n
+            return threading.current_thread()
+
+        async def main():
+            thread1 = await fn(1)
+            thread2 = await fn(2)
+            assert len(pool.idle) == 1
+            assert thread1 is not thread2
+            assert thread1.name != thread2.name
+
+        asyncio.run(main())
+
     def test_thread(self):
         def t(foo, bar=None):
             with pytest.raises(RuntimeError):
@@ -265,3 +360,107 @@ class TestThreading(unittest.TestCase):
         assert th.is_alive() is False
         with pytest.raises(RuntimeError):
             th.start()
+        th.join()
+
+    def test_thread_join_timeout(self):
+        event = threading.Event()
+        th = threading.Thread(target=event.wait)
+        th.start()
+        start = time.monotonic()
+        th.join(0.01)
+        assert time.monotonic() - start >= 0.009
+        assert th.is_alive()
+        assert not th._task._callbacks
+        event.set()
+        th.join(1)
+        assert not th.is_alive()
+
+    def test_join_all(self):
+        events = [threading.Event() for i in range(3)]
+        threads = [threading.Thread(target=e.wait) for e in events]
+        with pytest.raises(RuntimeError):
+            threading.join_all(threads)
+        for th in threads:
+            th.start()
+        events[0].set()
+        assert threading.join_all(threads, timeout=0.01) is False
+        assert [th.is_alive() for th in threads] == [False, True, True]
+        threading.Timer(0.01, events[1].set).start()
+        threading.Timer(0.02, events[2].set).start()
+        assert threading.join_all(threads) is True
+        assert [th.is_alive() for th in threads] == [False, False, False]
+        assert threading.join_all(threads, timeout=0) is True
+
+    def test_thread_name(self):
+        th = threading.Thread(target=lambda: None)
+        assert th._name is None
+        assert th.name.startswith('GThread-')
+        assert th.name in repr(th)
+        th.name = 'foo'
+        assert th.name == 'foo'
+        assert repr(threading.Thread(name='bar')) == '<Thread(bar, initial)>'
+        th.start()
+        th.join()
+        assert repr(th) == '<Thread(foo, stopped %d)>' % th.ident
+
+    def test_local_switches(self):
+        class MyLocal(threading.local):
+            def __init__(self, value):
+                self.value = value
+                self.inits = getattr(self, 'inits', 0) + 1
+
+        data = threading.local()
+        my_data = MyLocal(42)
+        var = []
+
+        def t(i):
+            assert not hasattr(data, 'foo')
+            data.foo = i
+            assert my_data.value == 42
+            my_data.value = i
+            for j in range(3):
+                time.sleep(0)
+                var.append((data.foo, my_data.value, my_data.inits))
+            del data.foo
+            assert not hasattr(data, 'foo')
+
+        data.foo = 'main'
+        threads = [threading.Thread(target=t, args=(i,)) for i in range(2)]
+        for th in threads:
+            th.start()
+        threading.join_all(threads)
+        assert data.foo == 'main'
+        assert my_data.value == 42
+        assert var == [(0, 0, 1), (1, 1, 1)] * 3
+        # the values of threads that ended are released
+        assert len(object.__getattribute__(data, '_local__greens')) == 1
+
+    def test_current_thread(self):
+        dummies = []
+
+        @async_
+        def a():
+            thread = threading.current_thread()
+            assert thread is threading.current_thread()
+            assert thread.name.startswith('Dummy-')
+            assert thread.ident == threading.get_ident()
+            assert thread.daemon
+            dummies.append(weakref.ref(thread))
+            return thread.name
+
+        async def b():
+            names = await asyncio.gather(a(), a())
+            assert names[0] != names[1]
+
+        asyncio.run(b())
+        gc.collect()
+        # the dummy threads are released along with their greenlets
+        assert [d() for d in dummies] == [None, None]
+
+        def t():
+            assert threading.current_thread() is th
+
+        th = threading.Thread(target=t)
+        th.start()
+        th.join()
+        assert threading.current_thread() is not th
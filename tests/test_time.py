@@ -0,0 +1,56 @@
+import asyncio
+import unittest
+import pytest
+from greenletio import async_
+from greenletio.core import bridge
+from greenletio.green import time
+
+
+class TestTime(unittest.TestCase):
+    def setUp(self):
+        pass
+
+    def tearDown(self):
+        bridge.stop()
+
+    def test_sleep(self):
+        var = []
+
+        @async_
+        def a(i, seconds):
+            start = time.monotonic()
+            time.sleep(seconds)
+            assert time.monotonic() - start >= seconds - 0.001
+            var.append(i)
+
+        async def b():
+            await asyncio.gather(a(0, 0.03), a(1, 0.01), a(2, 0.02),
+                                 a(3, 0.01))
+            assert var == [1, 3, 2, 0]
+
+        asyncio.run(b())
+        with pytest.raises(ValueError):
+            time.sleep(-1)
+
+    def test_sleep_zero(self):
+        var = []
+
+        @async_
+        def a(i):
+            for j in range(3):
+                var.append(i)
+                time.sleep(0)
+
+        async def b():
+            await asyncio.gather(a(0), a(1))
+            assert var == [0, 1, 0, 1, 0, 1]
+
+        asyncio.run(b())
+
+    def test_sleep_without_loop(self):
+        # synchronous code starts the loop in the bridge when it sleeps
+        asyncio.set_event_loop(None)
+        start = time.monotonic()
+        time.sleep(0.01)
+        assert time.monotonic() - start >= 0.009
+        time.sleep(0)